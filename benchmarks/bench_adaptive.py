@@ -0,0 +1,57 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+import calc_sampling as cs
+
+EXPRESSIONS = ["sin(x)", "exp(-x^2) * sin(10x)", "tan(x)", "sin(1/x)", "sqrt(abs(x)) * floor(x)"]
+DOMAIN = (-10, 10)
+REFERENCE_SAMPLES = 10**7
+PLOT_HEIGHT = 500 # pixels the curve's height is drawn over
+
+# 99th percentile distance, in pixels, between the straight lines through (x, y) and
+# the reference curve, over the points where both are defined. Values are clipped to
+# the same band adaptive sampling refines in, so poles don't dominate.
+def pixel_error(x, y, ref_x, ref_y, low, high):
+    height = high - low
+    approx = np.clip(np.interp(ref_x, x, y), low - height, high + height)
+    ref_y = np.clip(ref_y, low - height, high + height)
+    both = np.isfinite(approx) & np.isfinite(ref_y)
+    return np.percentile(np.abs(approx[both] - ref_y[both]), 99) / height * PLOT_HEIGHT
+
+def main():
+    print(f"{'expression':>24} {'adaptive pts':>13} {'error (px)':>11} {'ms':>7} "
+          f"{'uniform pts':>12} {'error (px)':>11} {'ms':>7} {'saving':>7}")
+    for line in EXPRESSIONS:
+        expr, _ = cp.parse(cl.tokenize(line, None), np.empty(0))
+        ref_x = np.linspace(*DOMAIN, num=REFERENCE_SAMPLES)
+        ref_y = cs.evaluate_at(expr, ref_x)
+        finite = ref_y[np.isfinite(ref_y)]
+        low, high = np.percentile(finite, [1, 99])
+
+        start = time.perf_counter()
+        x, y, evaluations = cs.adaptive(expr, DOMAIN)
+        adaptive_ms = (time.perf_counter() - start) * 1e3
+        adaptive_error = pixel_error(x, y, ref_x, ref_y, low, high)
+
+        # Fewest evenly spaced samples (in steps of 2x) that are at least as accurate
+        samples = evaluations
+        while True:
+            start = time.perf_counter()
+            ux = np.linspace(*DOMAIN, num=samples)
+            uy = cs.evaluate_at(expr, ux)
+            uniform_ms = (time.perf_counter() - start) * 1e3
+            uniform_error = pixel_error(ux, uy, ref_x, ref_y, low, high)
+            if uniform_error <= adaptive_error or samples >= REFERENCE_SAMPLES // 2:
+                break
+            samples *= 2
+        print(f"{line:>24} {evaluations:>13,} {adaptive_error:>11.3f} {adaptive_ms:>7.1f} "
+              f"{samples:>12,} {uniform_error:>11.3f} {uniform_ms:>7.1f} {samples / evaluations:>6.0f}x")
+
+if __name__ == "__main__":
+    main()
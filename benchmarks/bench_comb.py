@@ -0,0 +1,45 @@
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_parser as cp
+
+# Large n with small m, where the factorials are enormous but the result isn't
+CASES = [(1_000, 3), (10_000, 3), (100_000, 3), (100_000, 50), (100_000, 1_000)]
+FACT_SIZES = [1_000, 10_000, 50_000]
+
+# C and P as they were before math.comb/math.perm
+def factorial_C(n, m):
+    return math.factorial(n) // (math.factorial(m) * math.factorial(n - m))
+
+def factorial_P(n, m):
+    return math.factorial(n) // math.factorial(n - m)
+
+def per_call(fun, *args):
+    calls = 0
+    start = time.perf_counter()
+    while calls == 0 or time.perf_counter() - start < 0.2:
+        fun(*args)
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+def main():
+    print(f"{'':>3} {'n':>9} {'m':>5} {'factorials (us)':>16} {'now (us)':>10} {'speedup':>8}")
+    for name, before_fun in (("C", factorial_C), ("P", factorial_P)):
+        fun = cp.Function.functions[name]
+        for n, m in CASES:
+            before = per_call(before_fun, n, m)
+            after = per_call(fun, n, m)
+            print(f"{name:>3} {n:>9,} {m:>5} {before * 1e6:>16.1f} {after * 1e6:>10.2f} {before / after:>7.0f}x")
+
+    print(f"\n{'n':>9} {'math.factorial (us)':>20} {'cached fact (us)':>17}")
+    for n in FACT_SIZES:
+        uncached = per_call(math.factorial, n)
+        cp.Function.fact(n)
+        cached = per_call(cp.Function.fact, n)
+        print(f"{n:>9,} {uncached * 1e6:>20.1f} {cached * 1e6:>17.2f}")
+
+if __name__ == "__main__":
+    main()
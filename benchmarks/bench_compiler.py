@@ -0,0 +1,34 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+import calc_compiler as cc
+
+EXPRESSIONS = [
+    "1 + 2 * 3",
+    "sqrt(2)^2 - 4 / 3 + 7 mod 3",
+    "sin(pi/4) * cos(pi/4) + ln(10) - floor(2.5) * abs(-3)",
+    "((((1 + 2) * 3 - 4) / 5 + 6) * 7 - 8) / 9 + gcf(12, 18) * C(10, 3)",
+]
+CALLS = 100_000
+
+def time_calls(fun, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fun()
+    return time.perf_counter() - start
+
+def main():
+    print(f"{'tree (s)':>10} {'compiled (s)':>13} {'speedup':>8}  expression")
+    for line in EXPRESSIONS:
+        expr, _ = cp.parse(cl.tokenize(line, None))
+        compiled = cc.compile_expr(expr)
+        tree = time_calls(expr.evaluate, CALLS)
+        flat = time_calls(compiled, CALLS)
+        print(f"{tree:>10.3f} {flat:>13.3f} {tree / flat:>7.1f}x  {line}")
+
+if __name__ == "__main__":
+    main()
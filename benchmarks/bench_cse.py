@@ -0,0 +1,40 @@
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+import calc_optimizer as co
+import calc_compiler as cc
+
+EXPRESSION = "sin(x)^2 + sin(x)*cos(x) + sin(x)"
+
+# Returns (seconds, peak bytes allocated) for one call
+def measure(fun):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fun()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def main():
+    print(EXPRESSION)
+    print(f"{'samples':>10} {'parse (MB)':>11} {'tree (s)':>9} {'tree (MB)':>10} {'shared (s)':>11} {'shared (MB)':>12}")
+    for samples in (10**5, 10**6, 10**7):
+        calc.NUM_SAMPLES = samples
+        toks = cl.tokenize(EXPRESSION, None)
+        _, parse_peak = measure(lambda: cp.parse(toks))
+        expr, _ = cp.parse(toks)
+        compiled = cc.compile_expr(co.share(expr))
+        tree_time, tree_peak = measure(expr.evaluate)
+        shared_time, shared_peak = measure(compiled)
+        print(f"{samples:>10} {parse_peak / 1e6:>11.1f} {tree_time:>9.3f} {tree_peak / 1e6:>10.1f} "
+              f"{shared_time:>11.3f} {shared_peak / 1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main()
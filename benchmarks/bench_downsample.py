@@ -0,0 +1,41 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+import calc_inplace as ci
+import calc_sampling as cs
+
+EXPRESSION = "sin(x) + sin(40x) / 10"
+
+# Returns (seconds, bytes) to serialize a figure of the points like fig.show() does
+def serialize(x, y):
+    start = time.perf_counter()
+    payload = go.Figure(data=[go.Scatter(x=x, y=y)]).to_json()
+    return time.perf_counter() - start, len(payload)
+
+def main():
+    print(f"{EXPRESSION}, downsampled to {calc.PLOT_POINTS:,} points")
+    print(f"{'samples':>11} {'full (s)':>9} {'full (MB)':>10} "
+          f"{'downsample (s)':>15} {'reduced (s)':>12} {'reduced (MB)':>13}")
+    serialize([0, 1], [0, 1]) # first figure pays for plotly's setup
+    for samples in (10**4, 10**5, 10**6, 10**7):
+        x = np.linspace(*calc.DOMAIN, num=samples)
+        expr, _ = cp.parse(cl.tokenize(EXPRESSION, None), x)
+        y = ci.evaluate(expr)
+        full_time, full_size = serialize(x, y)
+        start = time.perf_counter()
+        small_x, small_y = cs.downsample(x, y, calc.PLOT_POINTS)
+        downsample_time = time.perf_counter() - start
+        small_time, small_size = serialize(small_x, small_y)
+        print(f"{samples:>11,} {full_time:>9.3f} {full_size / 1e6:>10.2f} "
+              f"{downsample_time:>15.3f} {small_time:>12.3f} {small_size / 1e6:>13.3f}")
+
+if __name__ == "__main__":
+    main()
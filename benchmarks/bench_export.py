@@ -0,0 +1,24 @@
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_export
+
+GRAPHS = 2000
+
+def main():
+    text = "\n".join(f"sin({i % 50 + 1}x) * exp(-x^2 / {i % 7 + 1}) + {i}" for i in range(GRAPHS)) + "\n"
+    print(f"{GRAPHS:,} graphs of {calc.NUM_SAMPLES:,} samples")
+    print(f"{'format':>6} {'seconds':>8} {'ms/graph':>9} {'MB written':>11}")
+    for fmt in calc_export.writers:
+        with tempfile.TemporaryDirectory() as directory:
+            _, _, seconds = calc.export(io.StringIO(text), io.StringIO(), directory, fmt)
+            size = sum(f.stat().st_size for f in Path(directory).iterdir())
+        print(f"{fmt:>6} {seconds:>8.3f} {seconds / GRAPHS * 1e3:>9.3f} {size / 1e6:>11.1f}")
+    print("plotly imported:", "plotly" in sys.modules)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_parser as cp
+
+SIZES = [10, 50, 94, 1_000, 10_000, 100_000, 1_000_000]
+LOOP_LIMIT = 100_000  # the linear loop takes minutes past this
+
+# The loop cfunctions.fib ran before fast doubling, carried on in Python ints
+def linear(n):
+    prev, curr = 0, 1
+    for _ in range(2, n):
+        curr += prev
+        prev = curr - prev
+    return 0 if n == 1 else curr
+
+def per_call(fun, n):
+    calls = 0
+    start = time.perf_counter()
+    while calls == 0 or time.perf_counter() - start < 0.2:
+        fun(n)
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+def main():
+    print(f"{'n':>9} {'loop (us)':>12} {'fib (us)':>12} {'speedup':>8}")
+    for n in SIZES:
+        fast = per_call(cp.Function.fib, n)
+        if n <= LOOP_LIMIT:
+            loop = per_call(linear, n)
+            print(f"{n:>9,} {loop * 1e6:>12.1f} {fast * 1e6:>12.1f} {loop / fast:>7.1f}x")
+        else:
+            print(f"{n:>9,} {'-':>12} {fast * 1e6:>12.1f}")
+    # fib(n) for n <= 94 comes from the memo after its first call
+    lib = cp.c_functions()
+    print(f"\nfib(94): cfunctions {per_call(lib.fib, 94) * 1e9:.0f} ns, "
+          f"memo {per_call(cp.Function.fib, 94) * 1e9:.0f} ns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+import calc_inplace as ci
+
+SAMPLES = 10**6
+TERMS = ["sin(x)", "2x", "cos(x)/3", "-x^2", "sqrt(abs(x))", "exp(-x^2)", "(x + 1)(x - 1)"]
+
+def sum_expression(n):
+    return " + ".join(TERMS[i % len(TERMS)] for i in range(n))
+
+# x*(x + (x*(x + ...))), which keeps one operand per level alive in the tree walk
+def nested_expression(n):
+    ops = ["*", "+"]
+    return "".join(f"x{ops[i % 2]}(" for i in range(n)) + "x" + ")" * n
+
+# Returns (seconds, peak bytes allocated) for one call
+def measure(fun):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fun()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def main():
+    calc.NUM_SAMPLES = SAMPLES
+    array_mb = SAMPLES * 8 / 1e6
+    print(f"{SAMPLES:,} samples ({array_mb:.0f} MB per array)")
+    print(f"{'shape':>6} {'terms':>6} {'tree (s)':>9} {'tree (arrays)':>14} "
+          f"{'in place (s)':>13} {'in place (arrays)':>18}")
+    for shape, make in (("sum", sum_expression), ("nested", nested_expression)):
+        for n in (1, 10, 50, 200):
+            expr, _ = cp.parse(cl.tokenize(make(n), None))
+            tree_time, tree_peak = measure(expr.evaluate)
+            inplace_time, inplace_peak = measure(lambda: ci.evaluate(expr))
+            print(f"{shape:>6} {n:>6} {tree_time:>9.3f} {tree_peak / 1e6 / array_mb:>14.1f} "
+                  f"{inplace_time:>13.3f} {inplace_peak / 1e6 / array_mb:>18.1f}")
+
+if __name__ == "__main__":
+    main()
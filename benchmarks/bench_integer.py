@@ -0,0 +1,50 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_parser as cp
+
+SIZE = 200_000
+# (function, label, arguments) with x as float64 like a graph's samples
+CASES = [
+    ("prime", "x", lambda x: (x,)),
+    ("prime", "x + 10^15", lambda x: (x + 10**15,)),
+    ("fact", "x mod 200", lambda x: (x % 200,)),
+    ("fib", "x mod 2000", lambda x: (x % 2000,)),
+    ("gcf", "x, 360", lambda x: (x, 360.0)),
+    ("lcm", "x, 360", lambda x: (x, 360.0)),
+    ("C", "x, 3", lambda x: (x, 3.0)),
+    ("P", "x mod 500, 40", lambda x: (x % 500, 40.0)),
+]
+
+# Calling the scalar function once per element, as evaluating one line per value did
+def per_element(fun, args):
+    def call(*values):
+        try:
+            return float(fun(*(int(v) for v in values)))
+        except (ValueError, OverflowError):
+            return np.nan
+    return [call(*values) for values in zip(*np.broadcast_arrays(*args))]
+
+def timed(fun, *args):
+    start = time.perf_counter()
+    fun(*args)
+    return time.perf_counter() - start
+
+def main():
+    x = np.arange(2, SIZE + 2, dtype=float)
+    print(f"{SIZE:,} elements")
+    print(f"{'function':>22} {'per element (ms)':>17} {'array (ms)':>11} {'speedup':>8}")
+    for name, label, arguments in CASES:
+        fun = cp.Function.functions[name]
+        args = arguments(x)
+        fun(*args)  # builds the sieve and tables outside the timing
+        before = timed(per_element, fun, args)
+        after = timed(fun, *args)
+        print(f"{f'{name}({label})':>22} {before * 1e3:>17.1f} {after * 1e3:>11.2f} {before / after:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
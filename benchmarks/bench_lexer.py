@@ -0,0 +1,40 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+
+TERMS = ["12.5", "sin(x)", "3pi", "ans", "(4 - 2)", "fib(10)", "7!", "2^3"]
+OPS = [" + ", " * ", " - ", " / "]
+
+# Builds an expression of roughly n characters out of a repeating mix of terms.
+def make_expression(n):
+    parts = []
+    length = 0
+    i = 0
+    while length < n:
+        part = TERMS[i % len(TERMS)] + OPS[i % len(OPS)]
+        parts.append(part)
+        length += len(part)
+        i += 1
+    return "".join(parts) + "1"
+
+def best_time(fun, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f"{'chars':>8} {'tokens':>8} {'seconds':>10} {'us/char':>8}")
+    for n in (10_000, 20_000, 50_000, 100_000):
+        line = make_expression(n)
+        toks = cl.tokenize(line, 1)
+        t = best_time(lambda: cl.tokenize(line, 1))
+        print(f"{len(line):>8} {len(toks):>8} {t:>10.4f} {t / len(line) * 1e6:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+import calc_inplace as ci
+import calc_optimizer as co
+
+COUNTS = [10, 50]
+REPEATS = 5
+
+# Related curves, as when overlaying a family: they share sin(x), cos(x) and x^2
+def family(n):
+    return [f"{k}sin(x)^2 + cos(x) / (1 + x^2) - {k}x" for k in range(1, n + 1)]
+
+# One graph per expression, each parsed over its own sample array and evaluated and
+# plotted on its own, as graphing them one at a time did
+def separately(lines):
+    figures = []
+    for line in lines:
+        x = np.linspace(*calc.DOMAIN, num=calc.NUM_SAMPLES)
+        expr, _ = cp.parse(cl.tokenize(line, None), x)
+        y = ci.evaluate(co.share(co.optimize(expr)))
+        figures.append(calc.figure([(None, x, y)]))
+    return figures
+
+def together(lines):
+    calc.parse_cache.clear()
+    return calc.figure([(line, x, y) for line, (x, y) in zip(lines, calc.sample_graphs(lines))])
+
+def best(fun, *args):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fun(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    calc.NUM_SAMPLES = 100_000
+    calc.PLOT_POINTS = 4000
+    together(family(2))  # imports plotly and builds the grid outside the timing
+    print(f"{calc.NUM_SAMPLES:,} samples per curve")
+    print(f"{'curves':>7} {'separately (ms)':>16} {'together (ms)':>14} {'speedup':>8}")
+    for n in COUNTS:
+        lines = family(n)
+        before = best(separately, lines)
+        after = best(together, lines)
+        print(f"{n:>7} {before * 1e3:>16.1f} {after * 1e3:>14.1f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
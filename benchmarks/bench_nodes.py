@@ -0,0 +1,113 @@
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+
+FORMULAS = 10_000
+TERMS = ["3*sin(2)^2", "4*cos(2)", "sqrt(2)/2", "fib(20)", "5!", "gcf(84, 36)", "ln(10)", "-abs(-7) % 3"]
+EVALUATIONS = 20
+
+# The node classes as they were before __slots__: a __dict__ per node and a list of
+# arguments per Function
+class DictValue:
+    def __init__(self, val):
+        self.val = val
+        self.neg = 1
+
+    def evaluate(self):
+        return self.neg * self.val
+
+class DictFunction:
+    def __init__(self, fun, exprs):
+        self.fun = fun
+        self.exprs = exprs
+        self.neg = 1
+
+    def evaluate(self):
+        return self.neg * cp.Function.functions[self.fun](*[expr.evaluate() for expr in self.exprs])
+
+class DictBinop:
+    def __init__(self, op, expr1, expr2):
+        self.op = op
+        self.expr1 = expr1
+        self.expr2 = expr2
+        self.neg = 1
+
+    def evaluate(self):
+        return self.neg * cp.Binop.operations[self.op](self.expr1.evaluate(), self.expr2.evaluate())
+
+def formula(i):
+    return " + ".join(TERMS[(i + j) % len(TERMS)] for j in range(i % 4 + 2)) + f" + {i}"
+
+# Copies expr's tree with the given node classes, sharing its Values' numbers
+def copy_tree(expr, value, function, binop, sequence):
+    if isinstance(expr, cp.Value):
+        new = value(expr.val)
+    elif isinstance(expr, cp.Function):
+        new = function(expr.fun, sequence(copy_tree(child, value, function, binop, sequence)
+                                          for child in expr.exprs))
+    else:
+        new = binop(expr.op, copy_tree(expr.expr1, value, function, binop, sequence),
+                    copy_tree(expr.expr2, value, function, binop, sequence))
+    new.neg = expr.neg
+    return new
+
+def slots_tree(expr):
+    return copy_tree(expr, cp.Value, cp.Function, cp.Binop, tuple)
+
+def dict_tree(expr):
+    return copy_tree(expr, DictValue, DictFunction, DictBinop, list)
+
+def count_nodes(expr):
+    if isinstance(expr, cp.Value):
+        return 1
+    children = expr.exprs if isinstance(expr, cp.Function) else (expr.expr1, expr.expr2)
+    return 1 + sum(count_nodes(child) for child in children)
+
+# Bytes allocated by build(), which returns what to keep alive while measuring
+def allocated(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+def best_time(fun, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def evaluate_all(exprs):
+    for _ in range(EVALUATIONS):
+        for expr in exprs:
+            expr.evaluate()
+
+def main():
+    toks = [cl.tokenize(formula(i), None) for i in range(FORMULAS)]
+    exprs = [cp.parse(t)[0] for t in toks]
+    nodes = sum(count_nodes(expr) for expr in exprs)
+    slots = allocated(lambda: [slots_tree(expr) for expr in exprs])
+    dicts = allocated(lambda: [dict_tree(expr) for expr in exprs])
+    dict_exprs = [dict_tree(expr) for expr in exprs]
+    evaluations = EVALUATIONS * len(exprs)
+    slots_time = best_time(lambda: evaluate_all(exprs))
+    dicts_time = best_time(lambda: evaluate_all(dict_exprs))
+
+    print(f"{FORMULAS:,} formulas, {nodes:,} nodes")
+    print(f"{'nodes':>10} {'bytes/node':>11} {'us/evaluate':>12}")
+    print(f"{'__dict__':>10} {dicts / nodes:>11.1f} {dicts_time / evaluations * 1e6:>12.2f}")
+    print(f"{'__slots__':>10} {slots / nodes:>11.1f} {slots_time / evaluations * 1e6:>12.2f}")
+    print(f"\n{dicts / slots:.2f}x less memory, {dicts_time / slots_time:.2f}x evaluation speed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import io
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+
+LINES = 200_000
+
+# Independent lines (no ans) so every line can go to the pool
+def make_input(n):
+    rng = random.Random(0)
+    funs = ["sqrt", "sin", "cos", "ln", "floor", "abs"]
+    lines = []
+    for _ in range(n):
+        a, b, c = rng.randint(1, 999), rng.randint(1, 999), rng.randint(1, 99)
+        lines.append(f"{rng.choice(funs)}({a} / {b}) * {c} + {a} mod {c} - 2^({b} mod 7)")
+    return "\n".join(lines) + "\n"
+
+def main():
+    text = make_input(LINES)
+    print(f"{LINES:,} lines, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'seconds':>8} {'lines/s':>10} {'speedup':>8}")
+    base = None
+    for workers in (1, 2, 4, 8):
+        _, _, seconds = calc.batch(io.StringIO(text), io.StringIO(), workers)
+        base = base or seconds
+        print(f"{workers:>7} {seconds:>8.3f} {LINES / seconds:>10,.0f} {base / seconds:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
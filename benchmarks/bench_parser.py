@@ -0,0 +1,50 @@
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_parser as cp
+
+OPS = ["ADD", "MULT", "SUB", "DIV", "POW", "MOD"]
+
+# A flat chain of n tokens like 1 + 2 * 3 - 4 / 5 ^ 6 ...
+def flat_tokens(n):
+    toks = [("NUM", "1")]
+    i = 0
+    while len(toks) < n:
+        toks.append((OPS[i % len(OPS)], None))
+        toks.append(("NUM", str(i % 9 + 1)))
+        i += 1
+    return toks
+
+# n tokens of nested parentheses and function calls like sqrt((sqrt((1))))
+def nested_tokens(n):
+    depth = n // 6
+    return [("FUN", "sqrt"), ("LPAREN", None), ("LPAREN", None)] * depth + \
+        [("NUM", "1")] + [("RPAREN", None), ("RPAREN", None)] * depth
+
+# Like timeit, the garbage collector is paused so its passes over the growing tree
+# don't show up as parser time.
+def best_time(fun, repeat=3):
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fun()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+def main():
+    print(f"{'shape':>7} {'tokens':>9} {'seconds':>9} {'us/token':>9}")
+    for shape, make in (("flat", flat_tokens), ("nested", nested_tokens)):
+        for n in (10_000, 100_000, 1_000_000):
+            toks = make(n)
+            t = best_time(lambda: cp.parse(toks))
+            print(f"{shape:>7} {len(toks):>9} {t:>9.3f} {t / len(toks) * 1e6:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_parser as cp
+
+# Primes near each magnitude; primes are the slowest case for both trial division
+# and Miller-Rabin since nothing rejects them early
+MAGNITUDES = [10**3, 10**6, 10**9, 10**12, 10**15, 10**18, 2**64 - 2000, 2**89, 2**127, 2**521]
+COUNT = 20
+TRIAL_LIMIT = 10**12  # trial division past this takes seconds per number
+
+def next_primes(n, count):
+    primes = []
+    while len(primes) < count:
+        if cp.Function.prime(n):
+            primes.append(n)
+        n += 1
+    return primes
+
+# The 6k +/- 1 trial division cfunctions.prime used before the sieve and Miller-Rabin
+def trial_division(n):
+    if n == 2 or n == 3:
+        return 1
+    if n % 2 == 0 or n % 3 == 0:
+        return 0
+    i = 5
+    while i * i <= n:
+        if n % i == 0 or n % (i + 2) == 0:
+            return 0
+        i += 6
+    return 1
+
+def per_call(fun, numbers):
+    start = time.perf_counter()
+    for n in numbers:
+        fun(n)
+    return (time.perf_counter() - start) / len(numbers)
+
+def main():
+    print(f"{'magnitude':>10} {'prime (us)':>11} {'trial division (us)':>20}")
+    for magnitude in MAGNITUDES:
+        primes = next_primes(magnitude, COUNT)
+        per_call(cp.Function.prime, primes)  # builds the sieve outside the timing
+        fast = per_call(cp.Function.prime, primes)
+        trial = f"{per_call(trial_division, primes) * 1e6:>20.1f}" if magnitude <= TRIAL_LIMIT else f"{'-':>20}"
+        print(f"{f'2^{magnitude.bit_length() - 1}':>10} {fast * 1e6:>11.1f} {trial}")
+
+if __name__ == "__main__":
+    main()
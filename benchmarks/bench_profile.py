@@ -0,0 +1,38 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+import calc_profile
+
+EXPRS = ["3*sin(2)^2 + 4*cos(2) - 1/7", "fib(40) + prime(97) * 5!", "((1+2)*(3+4))^2 % 11"]
+ROUNDS = 20_000
+
+def run():
+    for _ in range(ROUNDS):
+        for line in EXPRS:
+            cp.parse(cl.tokenize(line, None))[0].evaluate()
+
+def timed(fun):
+    start = time.perf_counter()
+    fun()
+    return time.perf_counter() - start
+
+def main():
+    run() # warm up, loading cfunctions
+    calls = ROUNDS * len(EXPRS)
+    # Best of a few runs, since the difference while disabled is within noise
+    before = min(timed(run) for _ in range(3))
+    with calc_profile.profiling() as profile:
+        enabled = timed(run)
+    after = min(timed(run) for _ in range(3))
+    print(f"{calls:,} lines parsed and evaluated")
+    print(f"{'never enabled':>18}: {before / calls * 1e6:6.2f} us/line")
+    print(f"{'profiling':>18}: {enabled / calls * 1e6:6.2f} us/line")
+    print(f"{'after disabling':>18}: {after / calls * 1e6:6.2f} us/line\n")
+    print(profile.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+
+# numpy function each scalar function used before the math fast path
+NUMPY = {
+    "exp": np.exp,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "ln": np.log,
+    "lg": np.log2,
+    "log": np.log10,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "abs": np.abs,
+    "round": np.round
+}
+ARGUMENT = 2.718
+EXPRESSION = "sin(1) + cos(2) * exp(0.5) - floor(2.5) + round(3.7) + abs(-2) + ln(5) + log(7)"
+CALLS = 200_000
+
+def best(fun, number=CALLS):
+    return min(timeit.repeat(fun, number=number, repeat=5)) / number
+
+def main():
+    print(f"{'function':>8} {'numpy (ns)':>11} {'scalar (ns)':>12} {'speedup':>8}")
+    for name, np_fun in NUMPY.items():
+        fun = cp.Function.functions[name]
+        before = best(lambda: np_fun(ARGUMENT))
+        after = best(lambda: fun(ARGUMENT))
+        print(f"{name:>8} {before * 1e9:>11.0f} {after * 1e9:>12.0f} {before / after:>7.1f}x")
+
+    # Whole expression, with the function table temporarily pointed back at numpy.
+    # numpy results are np.float64, which also slows down the arithmetic around them.
+    expr, _ = cp.parse(cl.tokenize(EXPRESSION, None))
+    after = best(expr.evaluate, CALLS // 10)
+    scalar_functions = dict(cp.Function.functions)
+    cp.Function.functions.update(NUMPY)
+    try:
+        before = best(expr.evaluate, CALLS // 10)
+    finally:
+        cp.Function.functions.update(scalar_functions)
+    print(f"\n{EXPRESSION}")
+    print(f"numpy {before * 1e6:.2f} us, scalar {after * 1e6:.2f} us, {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
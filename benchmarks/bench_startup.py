@@ -0,0 +1,67 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+RUNS = 15
+HEAVY_MODULES = ["numpy", "plotly", "ctypes"]
+
+# Median wall time of running code in a fresh interpreter
+def cold_start(code, runs=RUNS):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+# Modules from HEAVY_MODULES imported while evaluating line one-shot
+def heavy_imports(line):
+    code = "import sys, io, calculator as calc\n" \
+           f"calc.batch(io.StringIO({line!r}), io.StringIO())\n" \
+           f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    return result.stdout.split()
+
+# Total microseconds python -X importtime attributes to importing calculator
+def import_time():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import calculator"],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    for line in result.stderr.splitlines():
+        if line.rstrip().endswith("| calculator"):
+            return int(line.split("|")[1])
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculator cold start benchmark")
+    parser.add_argument("--max-ms", type=float,
+                        help="exit with an error if a one-shot calculation takes longer "
+                             "than this many ms over bare interpreter startup")
+    args = parser.parse_args()
+
+    interpreter = cold_start("pass")
+    one_shot = cold_start("import io, calculator as calc\n"
+                          "calc.batch(io.StringIO('1+2'), io.StringIO())")
+    overhead_ms = (one_shot - interpreter) * 1e3
+    print(f"interpreter startup     {interpreter * 1e3:8.1f} ms")
+    print(f"one-shot calculation    {one_shot * 1e3:8.1f} ms (+{overhead_ms:.1f} ms)")
+    print(f"import calculator       {import_time() / 1e3:8.1f} ms (-X importtime)")
+    for line in ("1+2", "sin(1) + prime(97)", "sin(x)"):
+        print(f"heavy modules for {line!r}: {', '.join(heavy_imports(line)) or 'none'}")
+
+    failed = False
+    if heavy_imports("1+2"):
+        print("FAIL: plain arithmetic imported heavy modules")
+        failed = True
+    if args.max_ms is not None and overhead_ms > args.max_ms:
+        print(f"FAIL: one-shot overhead {overhead_ms:.1f} ms exceeds {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
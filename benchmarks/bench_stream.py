@@ -0,0 +1,78 @@
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+import calc_inplace as ci
+import calc_sampling as cs
+
+EXPRESSION = "sin(x) * exp(-x^2 / 50) + cos(3x) / 4"
+
+class Extrema:
+    def __init__(self):
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __call__(self, x, y):
+        self.min = min(self.min, y.min())
+        self.max = max(self.max, y.max())
+
+# Returns (seconds, peak bytes allocated) for one call
+def measure(fun):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fun()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def whole(line, samples):
+    calc.NUM_SAMPLES = samples
+    expr, _ = cp.parse(cl.tokenize(line, None))
+    y = ci.evaluate(expr)
+    return y.min(), y.max()
+
+def streamed(line, samples):
+    expr, _ = cp.parse(cl.tokenize(line, None), np.empty(0))
+    cs.stream(expr, Extrema(), calc.DOMAIN, samples)
+
+# Plotted points as graphing did before streaming, from every sample at once
+def plotted_whole(line, samples):
+    calc.NUM_SAMPLES = samples
+    expr, _ = calc.parse_cache.parse(line, None)
+    cs.downsample(*calc.sample_graph(expr), calc.PLOT_POINTS)
+
+def plotted_streamed(line, samples):
+    calc.NUM_SAMPLES = samples
+    expr, _ = calc.parse_cache.parse(line, None)
+    calc.plot_graphs([expr])
+
+def main():
+    print(EXPRESSION, f"(chunks of {cs.CHUNK_SIZE:,})")
+    print(f"{'samples':>11} {'whole (s)':>10} {'whole (MB)':>11} {'stream (s)':>11} {'stream (MB)':>12}")
+    for samples in (10**6, 10**7, 10**8):
+        if samples <= 10**7:
+            whole_time, whole_peak = measure(lambda: whole(EXPRESSION, samples))
+            whole_cols = f"{whole_time:>10.3f} {whole_peak / 1e6:>11.1f}"
+        else:
+            whole_cols = f"{'-':>10} {'-':>11}"
+        stream_time, stream_peak = measure(lambda: streamed(EXPRESSION, samples))
+        print(f"{samples:>11,} {whole_cols} {stream_time:>11.3f} {stream_peak / 1e6:>12.1f}")
+
+    print(f"\nPoints to plot ({calc.PLOT_POINTS:,}) from calculator.plot_graphs")
+    print(f"{'samples':>11} {'whole (s)':>10} {'whole (MB)':>11} {'stream (s)':>11} {'stream (MB)':>12}")
+    for samples in (10**6, 10**7):
+        whole_time, whole_peak = measure(lambda: plotted_whole(EXPRESSION, samples))
+        stream_time, stream_peak = measure(lambda: plotted_streamed(EXPRESSION, samples))
+        print(f"{samples:>11,} {whole_time:>10.3f} {whole_peak / 1e6:>11.1f} "
+              f"{stream_time:>11.3f} {stream_peak / 1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+
+# A short body, and one slow enough for the memo to pay off
+CHEAP = "f(a) = 3a^2 - 2a + sin(a) / (1 + a^2)"
+SLOW = "g(n) = C(n + 2000, 300) mod 1000007"
+CALLS = 1_000_000
+REPARSE_CALLS = 20_000
+DISTINCT = 1000 # distinct arguments in the memoized runs
+MEMO_SIZE = 1024
+param_re = re.compile(r"(?<![a-z])a(?![a-z])")
+
+# What calling a formula took without user functions: substituting and parsing
+def reparse(body, values):
+    for value in values:
+        cp.parse(cl.tokenize(param_re.sub(f"({value!r})", body), None))[0].evaluate()
+
+def calls(fun, values):
+    for value in values:
+        fun(value)
+
+def timed(fun, *args):
+    start = time.perf_counter()
+    fun(*args)
+    return time.perf_counter() - start
+
+def with_memo(size, fun, values):
+    cp.USER_MEMO_SIZE = size
+    cp.clear_memos()
+    return timed(calls, fun, values)
+
+def main():
+    cheap = cp.define(cl.tokenize(CHEAP, None))
+    slow = cp.define(cl.tokenize(SLOW, None))
+    unique = [i / CALLS for i in range(CALLS)] # no call hits the memo
+    repeated = [i % DISTINCT for i in range(CALLS)]
+    print(f"{CALLS:,} calls, memo of {MEMO_SIZE} with {DISTINCT} distinct arguments\n")
+
+    print(CHEAP)
+    body = CHEAP.split("=", 1)[1]
+    reparsed = timed(reparse, body, unique[:REPARSE_CALLS]) * CALLS / REPARSE_CALLS
+    print(f"{'parsing each call':>26}: {reparsed:7.2f} s (extrapolated)")
+    print(f"{'compiled body, no memo':>26}: {with_memo(0, cheap, unique):7.2f} s")
+    print(f"{'memo, every call misses':>26}: {with_memo(MEMO_SIZE, cheap, unique):7.2f} s")
+    print(f"{'memo, repeated arguments':>26}: {with_memo(MEMO_SIZE, cheap, repeated):7.2f} s")
+
+    print(f"\n{SLOW}")
+    print(f"{'compiled body, no memo':>26}: {with_memo(0, slow, repeated[:CALLS // 100]) * 100:7.2f} s "
+          f"(extrapolated)")
+    print(f"{'memo, repeated arguments':>26}: {with_memo(MEMO_SIZE, slow, repeated):7.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calc_lexer as cl
+import calc_parser as cp
+import calc_vector as cv
+
+EXPRESSION = "3x^2 + sin(x) - exp(x / 10)"
+REPARSE_VALUES = 10_000
+MMAP_VALUES = 20_000_000
+x_re = re.compile(r"(?<![a-z])x(?![a-z])")
+
+# What evaluating over data took before: substituting and parsing each value
+def reparse(values):
+    return [cp.parse(cl.tokenize(x_re.sub(f"({value!r})", EXPRESSION), None))[0].evaluate()
+            for value in values]
+
+def main():
+    values = np.random.default_rng(0).uniform(-5, 5, REPARSE_VALUES)
+    expr = cv.parse(EXPRESSION)
+    start = time.perf_counter()
+    reparse(values.tolist())
+    before = time.perf_counter() - start
+    start = time.perf_counter()
+    cv.evaluate(expr, values)
+    after = time.perf_counter() - start
+    print(f"{REPARSE_VALUES:,} values: parsing each {before * 1e3:.1f} ms, "
+          f"calc_vector {after * 1e3:.2f} ms, {before / after:.0f}x")
+
+    with tempfile.TemporaryDirectory() as directory:
+        x_path, y_path = Path(directory) / "x.npy", Path(directory) / "y.npy"
+        x = np.lib.format.open_memmap(x_path, mode="w+", dtype=float, shape=(MMAP_VALUES,))
+        x[:] = np.linspace(-5, 5, MMAP_VALUES)
+        x.flush()
+        del x
+        tracemalloc.start()
+        start = time.perf_counter()
+        cv.evaluate_npy(expr, x_path, y_path)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    size = MMAP_VALUES * 8
+    print(f"{MMAP_VALUES:,} values .npy to .npy: {elapsed:.2f} s, {size / elapsed / 1e6:.0f} MB/s, "
+          f"peak {peak / 1e6:.1f} MB allocated for {size / 1e6:.0f} MB of input")
+
+if __name__ == "__main__":
+    main()
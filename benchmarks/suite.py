@@ -0,0 +1,202 @@
+import argparse
+import gc
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+
+# Benchmarks every stage of the calculator on fixed workloads and reports the median
+# and 95th percentile time per call, optionally saving them as JSON to compare
+# against a later run:
+#   python benchmarks/suite.py -o before.json
+#   ... change something ...
+#   python benchmarks/suite.py -o after.json --compare before.json
+# Everything runs locally; the graph cases build the plotly figure without showing it.
+# Each case is timed REPEAT times, every time over enough calls to take MIN_SAMPLE
+# seconds, with the garbage collector paused, after one untimed warm-up call.
+
+REPEAT = 20
+MIN_SAMPLE = 0.02 # seconds per timed sample
+MAX_CASE = 5.0 # seconds after which a case stops repeating, once it has MIN_REPEAT samples
+MIN_REPEAT = 5
+REGRESSION = 1.10 # median ratio reported as slower by --compare
+
+REPL_LINES = ["2+3", "3*sin(2)^2 + 4*cos(2)", "sqrt(2)/2", "fib(40) + 5!", "gcf(84, 36) * lcm(4, 6)",
+              "ln(10) - lg(8)", "(1+2)(3+4)", "pi*e^2", "C(20, 5) - P(10, 3)", "-abs(-7) % 3"]
+TERMS = ["12.5", "sin(x)", "3pi", "(4 - 2)", "fib(10)", "7!", "2^3", "sqrt(16)"]
+OPS = [" + ", " * ", " - ", " / "]
+GRAPH = "sin(x)^2 + cos(3x)/x - sqrt(abs(x))"
+GRAPH_SAMPLES = [10**3, 10**4, 10**5, 10**6, 10**7]
+LONG_CHARS = 100_000
+NESTED_DEPTH = 10_000
+# evaluate() walks the tree recursively, so its trees must stay within the recursion limit
+EVALUATE_LONG_CHARS = 2_000
+EVALUATE_NESTED_DEPTH = 200
+PRIMES = [1_000_000_007, 999_999_999_999_999_989, 18_446_744_073_709_551_557]
+FACTORIALS = [100, 1000, 10_000]
+
+# An expression of roughly n characters out of a repeating mix of terms, with x
+# replaced by a number so it evaluates to a scalar
+def long_expression(n):
+    parts = []
+    length = 0
+    i = 0
+    while length < n:
+        part = TERMS[i % len(TERMS)].replace("x", "2") + OPS[i % len(OPS)]
+        parts.append(part)
+        length += len(part)
+        i += 1
+    return "".join(parts) + "1"
+
+# depth levels of functions and parentheses like sqrt((sqrt((... 1 ...))))
+def nested_expression(depth):
+    return "sqrt((" * depth + "1" + "))" * depth
+
+def parse(line):
+    return cp.parse(cl.tokenize(line, None))[0]
+
+def evaluate_all(exprs):
+    for expr in exprs:
+        expr.evaluate()
+
+def graph(expr):
+    calc.figure([(None, *calc.sample_graph(expr))])
+
+# Factorials of n >= FACT_CACHE_MIN would come from the cache after the first call
+def factorial(n):
+    cp.fact_cache.clear()
+    cp.Function.fact(n)
+
+# (name, fun) for every case; setup work such as parsing happens here, untimed
+def cases():
+    toks = [cl.tokenize(line, None) for line in REPL_LINES]
+    long = long_expression(LONG_CHARS)
+    long_toks = cl.tokenize(long, None)
+    nested = nested_expression(NESTED_DEPTH)
+    nested_toks = cl.tokenize(nested, None)
+    exprs = [parse(line) for line in REPL_LINES]
+    long_expr = parse(long_expression(EVALUATE_LONG_CHARS))
+    nested_expr = parse(nested_expression(EVALUATE_NESTED_DEPTH))
+    lib = cp.c_functions()
+
+    yield "lexer/repl", lambda: [cl.tokenize(line, None) for line in REPL_LINES]
+    yield f"lexer/long/{LONG_CHARS}", lambda: cl.tokenize(long, None)
+    yield f"lexer/nested/{NESTED_DEPTH}", lambda: cl.tokenize(nested, None)
+    yield "parser/repl", lambda: [cp.parse(t) for t in toks]
+    yield f"parser/long/{LONG_CHARS}", lambda: cp.parse(long_toks)
+    yield f"parser/nested/{NESTED_DEPTH}", lambda: cp.parse(nested_toks)
+    yield "evaluate/repl", lambda: evaluate_all(exprs)
+    yield f"evaluate/long/{EVALUATE_LONG_CHARS}", long_expr.evaluate
+    yield f"evaluate/nested/{EVALUATE_NESTED_DEPTH}", nested_expr.evaluate
+    yield "end_to_end/repl", lambda: evaluate_all(parse(line) for line in REPL_LINES)
+    for n in PRIMES:
+        yield f"cfunctions/prime/{n}", lambda n=n: lib.prime(n)
+    yield "cfunctions/fib/94", lambda: lib.fib(94)
+    yield "integer/prime/2^89-1", lambda: cp.Function.prime(2**89 - 1)
+    yield "integer/fib/100000", lambda: cp.Function.fib(100_000)
+    for n in FACTORIALS:
+        yield f"integer/fact/{n}", lambda n=n: factorial(n)
+    for samples in GRAPH_SAMPLES:
+        calc.NUM_SAMPLES = samples
+        expr = parse(GRAPH)
+        yield f"graph/{samples:.0e}", lambda expr=expr: graph(expr)
+
+# Returns the seconds per call of each timed sample of fun
+def measure(fun):
+    fun()
+    start = time.perf_counter()
+    fun()
+    once = time.perf_counter() - start
+    number = max(1, math.ceil(MIN_SAMPLE / max(once, 1e-9)))
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        begin = time.perf_counter()
+        while len(samples) < REPEAT and (len(samples) < MIN_REPEAT or time.perf_counter() - begin < MAX_CASE):
+            start = time.perf_counter()
+            for _ in range(number):
+                fun()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return samples
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)]
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "min": min(samples),
+        "samples": len(samples),
+    }
+
+def environment():
+    import numpy as np
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calculator's lexer, parser, "
+                                     "evaluator, C functions and graphing")
+    parser.add_argument("-k", "--filter", default="", metavar="TEXT",
+                        help="only run cases whose name contains TEXT")
+    parser.add_argument("-o", "--output", metavar="FILE", help="save the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results saved in FILE")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'case':<38} {'median':>10} {'p95':>10} {'samples':>8}" + (f" {'vs baseline':>12}" if baseline else ""))
+    for name, fun in cases():
+        if args.filter not in name:
+            continue
+        stats = summarize(measure(fun))
+        results[name] = stats
+        line = f"{name:<38} {format_time(stats['median']):>10} {format_time(stats['p95']):>10} {stats['samples']:>8}"
+        if baseline and name in baseline:
+            ratio = stats["median"] / baseline[name]["median"]
+            flag = " slower" if ratio > REGRESSION else " faster" if ratio < 1 / REGRESSION else ""
+            line += f" {ratio:>11.2f}x{flag}"
+        print(line, flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
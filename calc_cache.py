@@ -0,0 +1,59 @@
+from collections import OrderedDict
+import calc_lexer as cl
+import calc_parser as cp
+
+# Bounded LRU cache of parsed expressions keyed on the input with whitespace removed.
+# Lines using ans also key on the value of ans, since it is baked into their tokens.
+# Trees containing x are optimized and their common subexpressions shared before
+# they are stored. Their x is cp.unbound_samples(), so they don't hold the sample
+# array and have to be bound to samples to be evaluated (see calc_sampling.bind).
+# The cache should be cleared whenever a function is defined, as calls to it are
+# checked against its number of parameters.
+class ParseCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns (expr, graph_mode), or None if the line has no tokens
+    def parse(self, line, ans):
+        key = cl.whitespace_re.sub("", line)
+        if "ans" in key:
+            key = (key, type(ans), ans)
+        parsed = self.entries.get(key)
+        if parsed is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return parsed
+        self.misses += 1
+        toks = cl.tokenize(line, ans)
+        if not toks:
+            return None
+        # Only lines with x are graphs, and only graphs need numpy
+        graph = any(tok == "VAR" for tok, _ in toks)
+        parsed = cp.parse(toks, cp.unbound_samples() if graph else None)
+        if parsed[1]:
+            # Without x the whole tree is constant, so folding it would just
+            # evaluate it an extra time. Imported here as only graphs need it.
+            import calc_optimizer as co
+            parsed = co.share(co.optimize(parsed[0])), True
+        if self.maxsize > 0:
+            self.entries[key] = parsed
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return parsed
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return f"{self.hits:,} hits, {self.misses:,} misses ({rate:.1%} hit rate), " + \
+            f"{len(self.entries):,}/{self.maxsize:,} entries"
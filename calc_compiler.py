@@ -0,0 +1,108 @@
+import calc_parser as cp
+
+# Compiles an expression tree from calc_parser.parse into a Python function that
+# takes no arguments and returns the same result as expr.evaluate(). Given the
+# Params of a user-defined function's body, the function takes them as arguments.
+#
+# The tree is flattened into straight-line code that evaluates it like a stack
+# machine: every node writes its result into a register named after its stack
+# depth, so no recursion, dictionary lookups, or neg multiplications happen when
+# the function is called. Constant values have their sign applied at compile time
+# and functions/operations are bound directly into the function's globals.
+#
+# The tree may also be a DAG (see calc_optimizer.share). A node with several parents
+# is computed once into its own variable, which is deleted after its last use.
+
+# Binops that map straight onto Python operators; the rest go through Binop's
+# checked helpers so errors like division by zero are still raised.
+operators = {
+    "POW": "**",
+    "MULT": "*",
+    "ADD": "+",
+    "SUB": "-"
+}
+
+def children(expr):
+    if isinstance(expr, cp.Value):
+        return []
+    return expr.exprs if isinstance(expr, cp.Function) else [expr.expr1, expr.expr2]
+
+# Number of parents of each node, by id. Each time a node is given as one of exprs
+# counts as a parent too, so roots that are also subtrees of other roots are shared.
+def count_parents(*exprs):
+    parents = {}
+    stack = []
+    for expr in exprs:
+        if id(expr) not in parents:
+            parents[id(expr)] = 0
+            stack.append(expr)
+        parents[id(expr)] += 1
+    while stack:
+        for child in children(stack.pop()):
+            if id(child) not in parents:
+                parents[id(child)] = 0
+                stack.append(child)
+            parents[id(child)] += 1
+    return parents
+
+def compile_expr(expr, params=()):
+    lines = []
+    namespace = {}
+    names = {}
+    parents = count_parents(expr)
+    uses_left = dict(parents)
+    shared = {} # id of shared node -> variable holding its value
+    results = [] # names holding the values of the nodes emitted so far
+
+    def bind(prefix, obj):
+        key = (prefix, id(obj))
+        if key not in names:
+            names[key] = f"{prefix}{len(names)}"
+            namespace[names[key]] = obj
+        return names[key]
+
+    def emit(node, code, num_args):
+        args = results[-num_args:]
+        del results[-num_args:]
+        code = code(*args) if node.neg == 1 else f"-({code(*args)})"
+        if parents[id(node)] > 1:
+            target = shared[id(node)] = f"s{len(shared)}"
+        else:
+            target = f"r{len(results)}"
+        lines.append(f"    {target} = {code}")
+        for child, arg in zip(children(node), args):
+            uses_left[id(child)] -= 1
+            if uses_left[id(child)] == 0 and id(child) in shared:
+                lines.append(f"    del {arg}")
+        results.append(target)
+
+    # Iterative post-order walk: a node is emitted once all its children have been.
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if isinstance(node, cp.Value) and isinstance(node.val, cp.Param):
+            arg = f"p{node.val.index}"
+            if node.neg == -1:
+                lines.append(f"    r{len(results)} = -{arg}")
+                arg = f"r{len(results)}"
+            results.append(arg)
+        elif isinstance(node, cp.Value):
+            results.append(bind("c", node.val if node.neg == 1 else node.neg * node.val))
+        elif id(node) in shared:
+            results.append(shared[id(node)])
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+        elif isinstance(node, cp.Function):
+            fun = bind("f", cp.Function.functions[node.fun])
+            emit(node, lambda *args: f"{fun}({', '.join(args)})", len(node.exprs))
+        elif node.op in operators:
+            emit(node, lambda a, b: f"{a} {operators[node.op]} {b}", 2)
+        else:
+            op = bind("f", cp.Binop.operations[node.op])
+            emit(node, lambda a, b: f"{op}({a}, {b})", 2)
+
+    args = ", ".join(f"p{param.index}" for param in params)
+    source = f"def compiled({args}):\n" + "\n".join(lines) + f"\n    return {results[0]}\n"
+    exec(compile(source, "<calc_compiler>", "exec"), namespace)
+    return namespace["compiled"]
@@ -0,0 +1,100 @@
+import numpy as np
+
+# Writers for graph samples that don't need plotly or a browser, for rendering
+# graphs in bulk. Each takes the x and y arrays produced by calculator.sample_graph.
+# The csv and npy files can also be written a chunk of samples at a time (see
+# streams below), for graphs with more samples than fit in memory.
+
+def write_csv(path, x, y):
+    np.savetxt(path, np.column_stack((x, y)), delimiter=",", header="x,y", comments="")
+
+# Saves a 2 x n array with x in the first row and y in the second
+def write_npy(path, x, y):
+    np.save(path, np.vstack((x, y)))
+
+# Draws the curve as SVG polylines, broken wherever y is nan, with the axes drawn
+# where they fall inside the plotted range
+def write_svg(path, x, y, width=800, height=500, margin=20):
+    finite = np.isfinite(y)
+    x_min, x_max = x[0], x[-1]
+    y_min, y_max = (y[finite].min(), y[finite].max()) if finite.any() else (-1, 1)
+    if x_min == x_max:
+        x_min, x_max = x_min - 1, x_max + 1
+    if y_min == y_max:
+        y_min, y_max = y_min - 1, y_max + 1
+    x_scale = (width - 2 * margin) / (x_max - x_min)
+    y_scale = (height - 2 * margin) / (y_max - y_min)
+    px = margin + (x - x_min) * x_scale
+    py = height - margin - (y - y_min) * y_scale
+
+    lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">',
+             f'<rect width="{width}" height="{height}" fill="white"/>']
+    if x_min <= 0 <= x_max:
+        zero = margin - x_min * x_scale
+        lines.append(f'<line x1="{zero:.2f}" y1="0" x2="{zero:.2f}" y2="{height}" stroke="black"/>')
+    if y_min <= 0 <= y_max:
+        zero = height - margin + y_min * y_scale
+        lines.append(f'<line x1="0" y1="{zero:.2f}" x2="{width}" y2="{zero:.2f}" stroke="black"/>')
+    # Runs of consecutive finite points
+    breaks = np.flatnonzero(np.diff(np.concatenate(([False], finite, [False])).astype(int)))
+    for start, end in zip(breaks[::2], breaks[1::2]):
+        points = " ".join(f"{a:.2f},{b:.2f}" for a, b in zip(px[start:end], py[start:end]))
+        lines.append(f'<polyline points="{points}" fill="none" stroke="#636efa" stroke-width="2"/>')
+    lines.append("</svg>")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+writers = {
+    "svg": write_svg,
+    "csv": write_csv,
+    "npy": write_npy
+}
+
+# Stream consumers (see calc_sampling.stream) writing the same files as write_csv and
+# write_npy from consecutive chunks of the num_samples samples. Used as context
+# managers, which close the file.
+class CsvStream:
+    def __init__(self, path, num_samples):
+        self.file = open(path, "w")
+        self.file.write("x,y\n")
+
+    def __call__(self, x, y):
+        np.savetxt(self.file, np.column_stack((x, y)), delimiter=",")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+# The file is memory mapped and filled in as the chunks arrive, with the dtype of
+# the first chunk
+class NpyStream:
+    def __init__(self, path, num_samples):
+        self.path = path
+        self.num_samples = num_samples
+        self.out = None
+        self.written = 0
+
+    def __call__(self, x, y):
+        if self.out is None:
+            self.out = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.result_type(x, y),
+                                                 shape=(2, self.num_samples))
+        end = self.written + x.size
+        self.out[0, self.written:end] = x
+        self.out[1, self.written:end] = y
+        self.written = end
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.out is not None:
+            self.out.flush()
+            self.out = None
+
+streams = {
+    "csv": CsvStream,
+    "npy": NpyStream
+}
@@ -0,0 +1,134 @@
+import numpy as np
+import calc_parser as cp
+import calc_compiler as cc
+
+# Evaluates graph-mode trees (or DAGs from calc_optimizer.share) over arrays without
+# allocating a new array per node. Intermediate results live in scratch buffers
+# that are written with NumPy's out= argument; once a parent has consumed a buffer
+# the parent either writes its own result into it or returns it to a free pool, so
+# the number of buffers alive at once depends on the shape of the tree rather than
+# its size. Nodes that can't be computed in place (integer functions, division by
+# zero, unusual dtypes) fall back to the regular functions in calc_parser and
+# give exactly the same results and errors as expr.evaluate().
+
+ufuncs = {
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "ln": np.log,
+    "lg": np.log2,
+    "log": np.log10,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "abs": np.abs,
+    "round": np.round
+}
+
+binop_ufuncs = {
+    "POW": np.power,
+    "MULT": np.multiply,
+    "DIV": np.true_divide,
+    "MOD": np.remainder,
+    "ADD": np.add,
+    "SUB": np.subtract
+}
+
+def is_array(x):
+    return isinstance(x, np.ndarray) and x.dtype == np.float64
+
+def is_scalar(x):
+    return isinstance(x, float) or isinstance(x, int) and cp.INT64_MIN <= x <= cp.INT64_MAX
+
+# Returns the shape the ufunc result would have, or None if it can't be computed
+# into a float64 buffer
+def inplace_shape(node, args):
+    if isinstance(node, cp.Function):
+        if node.fun not in ufuncs:
+            return None
+    elif not isinstance(args[1], np.ndarray) and node.op in ("DIV", "MOD") and args[1] == 0:
+        return None
+    shape = None
+    for arg in args:
+        if is_array(arg):
+            if shape is not None and arg.shape != shape:
+                return None
+            shape = arg.shape
+        elif not is_scalar(arg):
+            return None
+    return shape
+
+def evaluate(expr):
+    return evaluate_all([expr])[0]
+
+# Evaluates several trees together, returning the list of their values. Nodes shared
+# between them (see calc_optimizer.share_all) are computed once.
+def evaluate_all(exprs):
+    parents = cc.count_parents(*exprs)
+    uses_left = dict(parents)
+    shared = {} # id of shared node -> its value
+    scratch = set() # ids of the buffers allocated by this evaluation
+    pinned = set() # ids of scratch buffers holding shared values still to be used
+    pool = []
+    results = []
+
+    def take(shape):
+        for i, buf in enumerate(pool):
+            if buf.shape == shape:
+                return pool.pop(i)
+        buf = np.empty(shape)
+        scratch.add(id(buf))
+        return buf
+
+    stack = [(expr, False) for expr in reversed(exprs)]
+    while stack:
+        node, visited = stack.pop()
+        if id(node) in shared:
+            results.append(shared[id(node)])
+            continue
+        if isinstance(node, cp.Value):
+            if node.neg == -1 and is_array(node.val):
+                result = np.negative(node.val, out=take(node.val.shape))
+            else:
+                result = node.val if node.neg == 1 else node.evaluate()
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(cc.children(node)))
+            continue
+        else:
+            children = cc.children(node)
+            args = results[-len(children):]
+            del results[-len(children):]
+            # Buffers this node is the last user of
+            consumed = {}
+            for child, arg in zip(children, args):
+                uses_left[id(child)] -= 1
+                if uses_left[id(child)] == 0:
+                    pinned.discard(id(arg))
+                if id(arg) in scratch and id(arg) not in pinned:
+                    consumed[id(arg)] = arg
+            shape = inplace_shape(node, args)
+            if shape is None:
+                if isinstance(node, cp.Function):
+                    result = node.neg * cp.Function.functions[node.fun](*args)
+                else:
+                    result = node.neg * cp.Binop.operations[node.op](*args)
+            else:
+                out = next((arg for arg in consumed.values() if arg.shape == shape), None)
+                if out is None:
+                    out = take(shape)
+                consumed.pop(id(out), None)
+                if isinstance(node, cp.Function):
+                    result = ufuncs[node.fun](*args, out=out)
+                else:
+                    result = binop_ufuncs[node.op](*args, out=out)
+                if node.neg == -1:
+                    np.negative(result, out=result)
+            pool.extend(consumed.values())
+        if parents[id(node)] > 1:
+            shared[id(node)] = result
+            if id(result) in scratch:
+                pinned.add(id(result))
+        results.append(result)
+    return results
@@ -0,0 +1,106 @@
+import math
+import numpy as np
+import calc_parser as cp
+
+# Array versions of the integer functions, used by calc_parser.Function when an
+# argument is an array (e.g. prime(x) in a graph). Rather than raising for the whole
+# array, elements the scalar function would reject (non-integers, out of range) give
+# nan, like the other functions do outside their domain. Results are float64 and
+# overflow to inf. prime, C and P loop over the whole buffer in a single call into
+# cfunctions; fact and fib look up tables of every value below float64's overflow.
+
+FACT_FLOAT_MAX = 170 # 171! > DBL_MAX
+FIB_FLOAT_MAX = 1477 # fib(1478) > DBL_MAX
+
+# float(n!) and float(fib(n + 1)) for every n up to where they overflow, built by
+# the first call that needs them
+fact_table = None
+fib_table = None
+
+# Returns (valid, n): which elements of x are whole numbers in [low, high], and x
+# as a contiguous array of dtype with the other elements replaced by low and any
+# above clip replaced by clip
+def whole_numbers(x, low, high, dtype=np.uint64, clip=None):
+    x = np.asarray(x)
+    if x.dtype.kind in "iu":
+        valid = (x >= low) & (x <= high)
+    else:
+        # high + 1 so that a high of UINT64_MAX, which rounds up to 2^64 as a
+        # float, doesn't let 2^64 through
+        valid = (x == np.floor(x)) & (x >= low) & (x < high + 1)
+    n = np.where(valid, x, low)
+    if clip is not None:
+        n = np.minimum(n, clip)
+    return valid, np.ascontiguousarray(n.astype(dtype))
+
+def pointer(array):
+    return array.ctypes.data
+
+def prime(x):
+    valid, n = whole_numbers(x, 2, cp.UINT64_MAX)
+    out = np.empty(n.shape)
+    cp.c_functions().prime_array(pointer(n), pointer(out), n.size)
+    out[~valid] = np.nan
+    # Floats past UINT64_MAX are whole multiples of 2^12, so aren't prime
+    out[np.isfinite(x) & (x >= cp.UINT64_MAX + 1)] = 0
+    return out
+
+# Past the end of their tables fact and fib are inf, so the tables end with an inf
+# that every larger n is clipped to
+def fact(x):
+    global fact_table
+    if fact_table is None:
+        fact_table = np.array([float(math.factorial(n)) for n in range(FACT_FLOAT_MAX + 1)] + [np.inf])
+    valid, n = whole_numbers(x, 0, math.inf, clip=FACT_FLOAT_MAX + 1)
+    out = fact_table[n]
+    out[~valid] = np.nan
+    return out
+
+def fib(x):
+    global fib_table
+    if fib_table is None:
+        fib_table = np.empty(FIB_FLOAT_MAX + 1)
+        a, b = 0, 1
+        for n in range(FIB_FLOAT_MAX):
+            fib_table[n] = a
+            a, b = b, a + b
+        fib_table[-1] = np.inf
+    valid, n = whole_numbers(x, 1, math.inf, clip=FIB_FLOAT_MAX + 1)
+    out = fib_table[n - 1]
+    out[~valid] = np.nan
+    return out
+
+# The two-argument functions broadcast their arguments against each other, so either
+# may be a plain number
+def gcf(x, y):
+    x, y = np.broadcast_arrays(x, y)
+    x_valid, n = whole_numbers(x, cp.INT64_MIN + 1, cp.INT64_MAX, np.int64)
+    y_valid, m = whole_numbers(y, cp.INT64_MIN + 1, cp.INT64_MAX, np.int64)
+    out = np.gcd(n, m).astype(float)
+    out[~(x_valid & y_valid)] = np.nan
+    return out
+
+def lcm(x, y):
+    x, y = np.broadcast_arrays(x, y)
+    x_valid, n = whole_numbers(x, cp.INT64_MIN + 1, cp.INT64_MAX, np.int64)
+    y_valid, m = whole_numbers(y, cp.INT64_MIN + 1, cp.INT64_MAX, np.int64)
+    gcd = np.gcd(n, m)
+    # Multiplied as floats since np.lcm wraps around on overflow. lcm(0, 0) is 0.
+    out = np.abs(n // np.maximum(gcd, 1) * m.astype(float))
+    out[~(x_valid & y_valid)] = np.nan
+    return out
+
+def count(kernel, x, y):
+    x, y = np.broadcast_arrays(x, y)
+    x_valid, n = whole_numbers(x, 0, cp.UINT64_MAX)
+    y_valid, m = whole_numbers(y, 0, cp.UINT64_MAX)
+    out = np.empty(n.shape)
+    kernel(pointer(n), pointer(m), pointer(out), n.size)
+    out[~(x_valid & y_valid)] = np.nan
+    return out
+
+def C(x, y):
+    return count(cp.c_functions().comb_array, x, y)
+
+def P(x, y):
+    return count(cp.c_functions().perm_array, x, y)
@@ -1,47 +1,48 @@
 import re
 
 whitespace_re = re.compile(r"\s+")
+# Order matters: at each position the first pattern that matches wins.
 tok_patterns = [
-    ("COMMA", re.compile(r"^,")),
-    ("LPAREN", re.compile(r"^\(")),
-    ("RPAREN", re.compile(r"^\)")),
-    ("EQUAL", re.compile(r"^=")),
-    ("POW", re.compile(r"^(\^|\*\*)")),
-    ("MULT", re.compile(r"^\*")),
-    ("DIV", re.compile(r"^/")),
-    ("MOD", re.compile(r"^(%|mod)")),
-    ("ADD", re.compile(r"^\+")),
-    ("SUB", re.compile(r"^-")),
-    ("FACT", re.compile(r"^!")),
-    ("ANS", re.compile(r"^ans")),
-    ("FUN", re.compile(r"^(sqrt|exp|sin|cos|tan|ln|lg|log|floor|ceil|abs|round|"
-                       r"gcf|lcm|C|P|prime|fib)")),
-    ("CONST", re.compile(r"^(pi|e|G|c)")),
-    ("VAR", re.compile(r"^x")),
-    ("NUM", re.compile(r"^(\d+\.\d+|\.\d+|\d+)")),
-    ("USER_FUN", re.compile(r"^\w+"))
+    ("COMMA", r","),
+    ("LPAREN", r"\("),
+    ("RPAREN", r"\)"),
+    ("EQUAL", r"="),
+    ("POW", r"(\^|\*\*)"),
+    ("MULT", r"\*"),
+    ("DIV", r"/"),
+    ("MOD", r"(%|mod)"),
+    ("ADD", r"\+"),
+    ("SUB", r"-"),
+    ("FACT", r"!"),
+    ("ANS", r"ans"),
+    ("FUN", r"(sqrt|exp|sin|cos|tan|ln|lg|log|floor|ceil|abs|round|"
+            r"gcf|lcm|C|P|prime|fib)"),
+    ("CONST", r"(pi|e|G|c)"),
+    ("VAR", r"x"),
+    ("NUM", r"(\d+\.\d+|\.\d+|\d+)"),
+    ("USER_FUN", r"\w+")
 ]
+# All patterns combined into one alternation so the line is scanned in a single pass.
+tok_re = re.compile("|".join(f"(?P<{tok}>{pattern})" for tok, pattern in tok_patterns))
 
 def tokenize(line, ans):
-    line = re.sub(whitespace_re, "", line)
+    line = whitespace_re.sub("", line)
     toks = []
-    while line:
-        for tok, pattern in tok_patterns:
-            _match = re.match(pattern, line)
-            if _match:
-                if tok == "ANS":
-                    if ans == None:
-                        raise ValueError("Invalid input (ans is not yet defined)")
-                    toks.append(("NUM", ans))
-                elif tok == "NUM":
-                    toks.append((tok, _match.group()))
-                elif tok == "FUN" or tok == "CONST" or tok == "VAR":
-                    toks.append((tok, _match.group()))
-                else:
-                    toks.append((tok, None))
-                line = re.sub(pattern, "", line, count=1)
-                break
-        else:
+    pos = 0
+    end = len(line)
+    while pos < end:
+        _match = tok_re.match(line, pos)
+        if not _match:
             raise ValueError("Invalid input")
-    
-    return toks
\ No newline at end of file
+        tok = _match.lastgroup
+        if tok == "ANS":
+            if ans == None:
+                raise ValueError("Invalid input (ans is not yet defined)")
+            toks.append(("NUM", ans))
+        elif tok == "NUM" or tok == "FUN" or tok == "CONST" or tok == "VAR" or tok == "USER_FUN":
+            toks.append((tok, _match.group()))
+        else:
+            toks.append((tok, None))
+        pos = _match.end()
+
+    return toks
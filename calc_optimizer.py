@@ -0,0 +1,119 @@
+import copy
+import calc_parser as cp
+
+# Simplifies an expression tree from calc_parser.parse before it is evaluated:
+#   - subtrees that don't depend on x are folded into a single Value
+#   - x * 1, 1 * x, x + 0, 0 + x, x - 0 and x ^ 1 are reduced to x (not x / 1, which
+#     turns ints into floats, or fails for ones too large to convert)
+#   - negations of the operands of * and / are merged into the result's sign
+# Subtrees whose evaluation fails are left as they are so the same error is raised
+# when the tree is evaluated.
+
+# Parameters of user-defined functions aren't constant, and neither are calls to those
+# functions since they can be redefined
+def is_constant(expr):
+    return isinstance(expr, cp.Value) and not cp.isarray(expr.val) and not isinstance(expr.val, cp.Param)
+
+def is_literal(expr, n):
+    return is_constant(expr) and expr.neg == 1 and type(expr.val) is int and expr.val == n
+
+def with_neg(expr, neg):
+    if expr.neg == neg:
+        return expr
+    expr = copy.copy(expr)
+    expr.neg = neg
+    return expr
+
+def fold(expr):
+    if isinstance(expr, cp.Value):
+        return expr if expr.neg == 1 or not is_constant(expr) else cp.Value(expr.evaluate())
+    children = expr.exprs if isinstance(expr, cp.Function) else [expr.expr1, expr.expr2]
+    if all(is_constant(child) for child in children) and \
+            not (isinstance(expr, cp.Function) and expr.fun in cp.user_functions):
+        try:
+            return cp.Value(expr.evaluate())
+        except Exception:
+            return expr
+    if isinstance(expr, cp.Function):
+        return expr
+    left, right = expr.expr1, expr.expr2
+    if expr.op == "MULT" and is_literal(left, 1) or expr.op == "ADD" and is_literal(left, 0):
+        return with_neg(right, right.neg * expr.neg)
+    if expr.op in ("MULT", "POW") and is_literal(right, 1) or \
+            expr.op in ("ADD", "SUB") and is_literal(right, 0):
+        return with_neg(left, left.neg * expr.neg)
+    if expr.op in ("MULT", "DIV") and (left.neg == -1 or right.neg == -1):
+        merged = cp.Binop(expr.op, with_neg(left, 1), with_neg(right, 1))
+        merged.neg = expr.neg * left.neg * right.neg
+        return merged
+    return expr
+
+def optimize(expr):
+    # Iterative post-order walk so deep trees don't hit the recursion limit
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if isinstance(node, cp.Value):
+            results.append(fold(node))
+        elif not visited:
+            stack.append((node, True))
+            children = node.exprs if isinstance(node, cp.Function) else [node.expr1, node.expr2]
+            stack.extend((child, False) for child in reversed(children))
+        elif isinstance(node, cp.Function):
+            n = len(node.exprs)
+            exprs = tuple(results[-n:])
+            del results[-n:]
+            new = cp.Function(node.fun, exprs)
+            new.neg = node.neg
+            results.append(fold(new))
+        else:
+            expr2 = results.pop()
+            expr1 = results.pop()
+            new = cp.Binop(node.op, expr1, expr2)
+            new.neg = node.neg
+            results.append(fold(new))
+    return results[0]
+
+# Hash-conses the tree into a DAG where structurally identical subtrees are a single
+# node, e.g. the three sin(x) in sin(x)^2 + sin(x)*cos(x) + sin(x). calc_compiler
+# evaluates each shared node once; evaluate() still works but recomputes them.
+# nodes maps the keys below to the nodes already built, so passing the same dict to
+# several calls shares subtrees between their trees too.
+def share(expr, nodes=None):
+    if nodes is None:
+        nodes = {}
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if isinstance(node, cp.Value):
+            val = node.val
+            # Arrays and Params are only equal to themselves (a Param's repr is its
+            # address); repr keeps 0.0 and -0.0 apart
+            key = ("V", node.neg, id(val) if cp.isarray(val) else (type(val), repr(val)))
+        elif not visited:
+            stack.append((node, True))
+            children = node.exprs if isinstance(node, cp.Function) else [node.expr1, node.expr2]
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        elif isinstance(node, cp.Function):
+            n = len(node.exprs)
+            exprs = tuple(results[-n:])
+            del results[-n:]
+            key = ("F", node.neg, node.fun, *map(id, exprs))
+            if key not in nodes and any(a is not b for a, b in zip(exprs, node.exprs)):
+                node = with_neg(cp.Function(node.fun, exprs), node.neg)
+        else:
+            expr2 = results.pop()
+            expr1 = results.pop()
+            key = ("B", node.neg, node.op, id(expr1), id(expr2))
+            if key not in nodes and (expr1 is not node.expr1 or expr2 is not node.expr2):
+                node = with_neg(cp.Binop(node.op, expr1, expr2), node.neg)
+        results.append(nodes.setdefault(key, node))
+    return results[0]
+
+# Shares subtrees within and between exprs, e.g. the sin(x) in sin(x)^2 and sin(x)/x
+def share_all(exprs):
+    nodes = {}
+    return [share(expr, nodes) for expr in exprs]
@@ -1,19 +1,58 @@
-import numpy as np
 import calculator as calc
+import importlib
 import math
-from collections import defaultdict
-import ctypes
+import sys
+from collections import OrderedDict, defaultdict
 from pathlib import Path
 
 UINT64_MAX = 0xffffffffffffffff
 INT64_MAX = 0x7fffffffffffffff
 INT64_MIN = -0x8000000000000000
-
-cfunctions = ctypes.CDLL(str(Path(__file__).parent) + "/cfunctions.so")
-cfunctions.prime.argtypes = [ctypes.c_uint64]
-cfunctions.prime.restype = ctypes.c_int
-cfunctions.fib.argtypes = [ctypes.c_int]
-cfunctions.fib.restype = ctypes.c_uint64
+FIB_MAX = 1_000_000 # fib(10^6) has 208,988 digits, about as many as the calculator shows
+FACT_CACHE_SIZE = 32
+FACT_CACHE_MIN = 1000 # smaller factorials take under 30 us, so aren't worth caching
+USER_MEMO_SIZE = 0 # scalar calls remembered per user-defined function, 0 for none
+MAX_CALL_DEPTH = 200 # nested user-defined function calls before giving up
+
+# Importing numpy takes longer than most calculations, so it is only imported the
+# first time one of its attributes is used.
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+np = LazyModule("numpy")
+
+# Loaded by c_functions() the first time prime or fib is called
+cfunctions = None
+# fib(n) for n <= 94, filled in as they're computed to skip the call into cfunctions
+fib_memo = {}
+# Least recently used factorials of n >= FACT_CACHE_MIN, which take milliseconds
+# to recompute once n is in the thousands
+fact_cache = OrderedDict()
+
+def c_functions():
+    global cfunctions
+    if cfunctions is None:
+        import ctypes
+        lib = ctypes.CDLL(str(Path(__file__).parent) + "/cfunctions.so")
+        lib.prime.argtypes = [ctypes.c_uint64]
+        lib.prime.restype = ctypes.c_int
+        lib.fib.argtypes = [ctypes.c_int]
+        lib.fib.restype = ctypes.c_uint64
+        # Array kernels take pointers to the buffers of contiguous numpy arrays
+        lib.prime_array.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t]
+        lib.prime_array.restype = None
+        for kernel in (lib.comb_array, lib.perm_array):
+            kernel.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t]
+            kernel.restype = None
+        cfunctions = lib
+    return cfunctions
 
 class ParseError(Exception):
     pass
@@ -31,9 +70,93 @@ def convert_to_number(x: str):
 def isnumber(x):
     return isinstance(x, float) or isinstance(x, int)
 
-# An expression is either a Value, Function, or Binop
+# Checks for a numpy array without importing numpy; if it hasn't been imported there
+# can't be any arrays.
+def isarray(x):
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(x, numpy.ndarray)
+
+# Baillie-PSW test for n > UINT64_MAX, which cfunctions.prime can't take: a strong
+# probable prime test to base 2 followed by a strong Lucas test. No composite is
+# known to pass both.
+def is_probable_prime(n):
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    x = pow(2, d, n)
+    if x != 1 and x != n - 1:
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    if math.isqrt(n) ** 2 == n:
+        return False
+    # Selfridge's parameters: the first D in 5, -7, 9, -11, ... with (D/n) = -1
+    D = 5
+    while jacobi(D, n) != -1:
+        D = -D - 2 if D > 0 else -D + 2
+    P, Q = 1, (1 - D) // 4
+    d, s = n + 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    # U_d and V_d by binary expansion of d, then V_(d * 2^r) for r < s
+    U, V, Qk = 1, P, Q % n
+    half = (n + 1) // 2
+    for bit in bin(d)[3:]:
+        U, V = U * V % n, (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if bit == "1":
+            U, V = (P * U + V) * half % n, (D * U + P * V) * half % n
+            Qk = Qk * Q % n
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
+
+def jacobi(a, n):
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+# F(k) by fast doubling, for fib past the uint64 range of cfunctions.fib:
+#   F(2k) = F(k) * (2F(k + 1) - F(k)),  F(2k + 1) = F(k)^2 + F(k + 1)^2
+# The last step only computes the half that is returned.
+def fib_doubling(k):
+    a, b = 0, 1
+    bits = bin(k)[2:]
+    for bit in bits[:-1]:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        a, b = (d, c + d) if bit == "1" else (c, d)
+    return a * a + b * b if bits[-1] == "1" else a * (2 * b - a)
+
+# An expression is either a Value, Function, or Binop. Parsed formulas are kept
+# around (e.g. in the calculator's parse cache), so nodes use __slots__ rather than
+# a __dict__ each, and a Function's arguments are a tuple.
 
 class Value:
+    __slots__ = ("val", "neg")
+
     def __init__(self, val):
         self.val = val
         self.neg = 1
@@ -54,82 +177,165 @@ class Function:
             return math.sqrt(x)
         return np.sqrt(x)
 
+    # Plain numbers go through math and the builtins, which are several times faster
+    # than numpy's scalar dispatch and return Python numbers; arrays use numpy.
+    def exp(x):
+        if isnumber(x):
+            return math.exp(x)
+        return np.exp(x)
+
+    def sin(x):
+        if isnumber(x):
+            return math.sin(x)
+        return np.sin(x)
+
+    def cos(x):
+        if isnumber(x):
+            return math.cos(x)
+        return np.cos(x)
+
     def tan(x):
         if isnumber(x):
             cosx = math.cos(x)
             if abs(cosx - round(cosx)) < calc.ROUND_THRESH and round(cosx) == 0:
                 raise ValueError("Undefined")
+            return math.tan(x)
         return np.tan(x)
 
     def ln(x):
-        if isnumber(x) and x <= 0:
-            raise ValueError("Cannot take log of value <= 0")
+        if isnumber(x):
+            if x <= 0:
+                raise ValueError("Cannot take log of value <= 0")
+            return math.log(x)
         return np.log(x)
     
     def lg(x):
-        if isnumber(x) and x <= 0:
-            raise ValueError("Cannot take log of value <= 0")
+        if isnumber(x):
+            if x <= 0:
+                raise ValueError("Cannot take log of value <= 0")
+            return math.log2(x)
         return np.log2(x)
     
     def log(x):
-        if isnumber(x) and x <= 0:
-            raise ValueError("Cannot take log of value <= 0")
+        if isnumber(x):
+            if x <= 0:
+                raise ValueError("Cannot take log of value <= 0")
+            return math.log10(x)
         return np.log10(x)
 
+    def floor(x):
+        if isnumber(x):
+            return math.floor(x)
+        return np.floor(x)
+
+    def ceil(x):
+        if isnumber(x):
+            return math.ceil(x)
+        return np.ceil(x)
+
+    def abs(x):
+        if isnumber(x):
+            return abs(x)
+        return np.abs(x)
+
+    def round(x):
+        if isnumber(x):
+            return round(x)
+        return np.round(x)
+
+    # The integer functions take arrays too, giving nan where an element is invalid.
+    # calc_integer needs numpy, which is already imported if there is an array.
     def fact(n):
+        if isarray(n):
+            import calc_integer
+            return calc_integer.fact(n)
         if not isinstance(n, int) or n < 0:
             raise ValueError("Undefined")
-        return math.factorial(int(n))
+        if n < FACT_CACHE_MIN:
+            return math.factorial(n)
+        if n in fact_cache:
+            fact_cache.move_to_end(n)
+            return fact_cache[n]
+        result = fact_cache[n] = math.factorial(n)
+        if len(fact_cache) > FACT_CACHE_SIZE:
+            fact_cache.popitem(last=False)
+        return result
 
     def gcf(n, m):
+        if isarray(n) or isarray(m):
+            import calc_integer
+            return calc_integer.gcf(n, m)
         if not isinstance(n, int) or not isinstance(m, int):
             raise ValueError("No GCF between non-integers")
         return math.gcd(int(n), int(m))
 
     def lcm(n, m):
+        if isarray(n) or isarray(m):
+            import calc_integer
+            return calc_integer.lcm(n, m)
         if not isinstance(n, int) or not isinstance(m, int):
             raise ValueError("No LCM between non-intergers")
         return math.lcm(int(n), int(m))
 
     def C(n, m):
+        if isarray(n) or isarray(m):
+            import calc_integer
+            return calc_integer.C(n, m)
         if not isinstance(n, int) or not isinstance(m, int):
             raise ValueError("Cannot count combinations of non-integers")
-        return math.factorial(n) // (math.factorial(m) * math.factorial(n - m))
+        if n < 0 or m < 0:
+            raise ValueError("Cannot count combinations of negative integers")
+        return math.comb(n, m)
     
     def P(n, m):
+        if isarray(n) or isarray(m):
+            import calc_integer
+            return calc_integer.P(n, m)
         if not isinstance(n, int) or not isinstance(m, int):
             raise ValueError("Cannot count permutations of non-integers")
-        return math.factorial(n) // math.factorial(n - m)
+        if n < 0 or m < 0:
+            raise ValueError("Cannot count permutations of negative integers")
+        return math.perm(n, m)
     
     def prime(n):
+        if isarray(n):
+            import calc_integer
+            return calc_integer.prime(n)
         if not isinstance(n, int) or n < 2:
             raise ValueError("Primality is defined only for positive integers" + \
                              " greater than or equal to 2")
         if n > UINT64_MAX:
-            raise ValueError("Calculation too large")
-        return cfunctions.prime(n)
+            return int(is_probable_prime(n))
+        return c_functions().prime(n)
     
     def fib(n):
+        if isarray(n):
+            import calc_integer
+            return calc_integer.fib(n)
         if not isinstance(n, int) or n < 1:
             raise ValueError("fib requires a natural number")
-        if n > 94: # fib(95) > UINT64_MAX
+        if n > FIB_MAX:
             raise ValueError("Calculation too large")
-        return cfunctions.fib(n)
+        if n > 94: # fib(95) > UINT64_MAX
+            return fib_doubling(n - 1)
+        if n not in fib_memo:
+            fib_memo[n] = c_functions().fib(n)
+        return fib_memo[n]
 
     functions = {
         "sqrt": sqrt,
-        "exp": np.exp,
-        "sin": np.sin,
-        "cos": np.cos,
+        "exp": exp,
+        "sin": sin,
+        "cos": cos,
         "tan": tan,
         "ln": ln,
         "lg": lg,
         "log": log,
-        "floor": np.floor,
-        "ceil": np.ceil,
+        "floor": floor,
+        "ceil": ceil,
         "fact": fact,
-        "abs": np.abs,
-        "round": np.round,
+        "abs": abs,
+        "round": round,
         "gcf": gcf,
         "lcm": lcm,
         "C": C,
@@ -145,6 +351,8 @@ class Function:
         "P": 2
     })
 
+    __slots__ = ("fun", "exprs", "neg")
+
     def __init__(self, fun, exprs):
         self.fun = fun
         self.exprs = exprs
@@ -155,16 +363,17 @@ class Function:
     
     def __str__(self):
         neg = "" if self.neg == 1 else "-"
-        return f"{neg}{self.fun}({self.exprs})"
+        return f"{neg}{self.fun}({list(self.exprs)})"
 
 class Binop:
+    # Dividing by an array (e.g. 1/x) leaves inf/nan where it is 0
     def div(x, y):
-        if y == 0:
+        if not isarray(y) and y == 0:
             raise ValueError("Undefined")
         return x / y
 
     def mod(x, y):
-        if y == 0:
+        if not isarray(y) and y == 0:
             raise ValueError("Undefined")
         return x % y
 
@@ -177,6 +386,8 @@ class Binop:
         "SUB": (lambda x, y: x - y)
     }
 
+    __slots__ = ("op", "expr1", "expr2", "neg")
+
     def __init__(self, op, expr1, expr2):
         self.op = op
         self.expr1 = expr1
@@ -190,85 +401,290 @@ class Binop:
         neg = "" if self.neg == 1 else "-"
         return f"{neg}{self.op}({self.expr1}, {self.expr2})"
 
+# Evaluates expr like expr.evaluate(). The parser handles expressions nested deeper
+# than Python's recursion limit (e.g. a sum of thousands of terms), which evaluate()
+# can't walk, so those are evaluated again with an explicit stack. The walk is about
+# 3x slower on the short expressions most input is made of, so it's only the fallback.
+def evaluate(expr):
+    try:
+        return expr.evaluate()
+    except RecursionError:
+        pass
+    # Post-order walk evaluating children left to right, like evaluate(), so the
+    # same errors are raised
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if isinstance(node, Value):
+            results.append(node.neg * node.val)
+        elif not visited:
+            stack.append((node, True))
+            if isinstance(node, Function):
+                stack.extend((child, False) for child in reversed(node.exprs))
+            else:
+                stack.extend(((node.expr2, False), (node.expr1, False)))
+        elif isinstance(node, Function):
+            n = len(node.exprs)
+            args = results[-n:]
+            del results[-n:]
+            results.append(node.neg * Function.functions[node.fun](*args))
+        else:
+            y = results.pop()
+            x = results.pop()
+            results.append(node.neg * Binop.operations[node.op](x, y))
+    return results[0]
+
+# A parameter of a user-defined function. Its uses in the body are Values holding it,
+# which calc_compiler turns into the compiled body's arguments.
+class Param:
+    __slots__ = ("name", "index")
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+    def __str__(self):
+        return self.name
+
+# A function defined with define, e.g. f(x) = 10x. The body is parsed, optimized and
+# compiled once; calls run the compiled body. With USER_MEMO_SIZE set, results of
+# calls with number arguments are kept in memo, the least recently used dropped past
+# that size. A lookup costs about as much as a short body, so this only pays off for
+# bodies calling fact, fib, prime or other slow functions.
+# Functions are called through Function nodes like the built-in ones, and stay the
+# same object when redefined so that trees calling them use the new body.
+class UserFunction:
+    def __init__(self, name):
+        self.name = name
+        self.params = []
+        self.body = None
+        self.compiled = None
+        self.memo = OrderedDict()
+
+    def __call__(self, *args):
+        if USER_MEMO_SIZE <= 0:
+            return self.run(args)
+        # 1 and 1.0 are equal as keys but can give different results
+        key = (*args, *map(type, args))
+        try:
+            result = self.memo.get(key, self) # self marks a miss as it can't be a result
+        except TypeError: # arrays aren't hashable, and aren't memoized
+            return self.run(args)
+        if result is not self:
+            self.memo.move_to_end(key)
+            return result
+        result = self.memo[key] = self.run(args)
+        if len(self.memo) > USER_MEMO_SIZE:
+            self.memo.popitem(last=False)
+        return result
+
+    def run(self, args):
+        global call_depth
+        # Nothing stops a recursive definition, so this is what ends it
+        if call_depth >= MAX_CALL_DEPTH:
+            raise ValueError("Recursion too deep")
+        # Bodies of other functions keep calling it as parsed, with the number of
+        # arguments it took then
+        if len(args) != len(self.params):
+            raise ParseError(f"Wrong number of arguments for {self.name}")
+        call_depth += 1
+        try:
+            return self.compiled(*args)
+        finally:
+            call_depth -= 1
+
+    def __str__(self):
+        return f"{self.name}({', '.join(param.name for param in self.params)}) = {self.body}"
+
+# Functions defined this session, by name. They are also in Function.functions.
+user_functions = {}
+call_depth = 0
+
+def clear_memos():
+    for fun in user_functions.values():
+        fun.memo.clear()
+
 constants = {
-    "pi": np.pi,
-    "e": np.e,
+    "pi": math.pi,
+    "e": math.e,
     "G": 6.67408e-11, # m^3 kg^-1 s^-2
     "c": 299_792_458 # m/s
 }
 
-def match_tok(target, toks):
-    tok = toks[0][0]
-    if target != tok:
+# NUM_SAMPLES points over DOMAIN, which x is bound to unless parse is given other
+# samples. Built once per DOMAIN and NUM_SAMPLES and shared by every tree, so trees
+# can share the nodes using x. It's read-only since trees like "x" evaluate to it.
+grid = None
+
+def default_samples():
+    global grid
+    key = (calc.DOMAIN, calc.NUM_SAMPLES)
+    if grid is None or grid[0] != key:
+        samples = np.linspace(*calc.DOMAIN, num=calc.NUM_SAMPLES)
+        samples.flags.writeable = False
+        grid = key, samples
+    return grid[1]
+
+# An empty array for x in trees that are bound to their samples later (see
+# calc_sampling.bind), so that parsing them doesn't build the sample array
+placeholder = None
+
+def unbound_samples():
+    global placeholder
+    if placeholder is None:
+        placeholder = np.empty(0)
+        placeholder.flags.writeable = False
+    return placeholder
+
+# Binary operators mapped to (precedence, right associative)
+binops = {
+    "ADD": (1, False),
+    "SUB": (1, False),
+    "MULT": (2, False),
+    "DIV": (2, False),
+    "MOD": (2, False),
+    "POW": (3, True)
+}
+
+# Markers kept on the operator stack alongside binop names
+NEG = "NEG"
+GROUP = "GROUP"
+
+class FunctionCall:
+    __slots__ = ("fun", "exprs")
+
+    def __init__(self, fun):
+        self.fun = fun
+        self.exprs = []
+
+# Shunting-yard parser that walks the tokens by index, using explicit operand and
+# operator stacks instead of recursion so long or deeply nested input is handled in
+# linear time. Unary minus applies to the primary that follows it and ! applies to
+# the primary before it, matching the grammar:
+#   additive       -> multiplicitive (("+" | "-") multiplicitive)*
+#   multiplicitive -> exponential (("*" | "/" | "%") exponential)*
+#   exponential    -> factorial ("^" exponential)?
+#   factorial      -> primary "!"?
+#   primary        -> "(" additive ")" | FUN "(" additive ("," additive)* ")"
+#                     | CONST | VAR | NUM | "-" primary
+# Every x in the expression is bound to samples, by default default_samples(). In
+# the body of a user-defined function, params maps the names of its parameters
+# (which may include x) to Params, and preprocess has made them VAR tokens; no other
+# variables are allowed.
+def parse_expression(toks, samples=None, params=None):
+    operands = []
+    operators = []
+    graph_mode = False
+    expect_operand = True
+    fact_allowed = False
+
+    def reduce(min_prec):
+        while operators and operators[-1] in binops and binops[operators[-1]][0] >= min_prec:
+            expr2 = operands.pop()
+            expr1 = operands.pop()
+            operands.append(Binop(operators.pop(), expr1, expr2))
+
+    def complete_primary():
+        while operators and operators[-1] is NEG:
+            operators.pop()
+            operands[-1].neg = -1
+
+    i = 0
+    n = len(toks)
+    while i < n:
+        tok, value = toks[i]
+        i += 1
+        if expect_operand:
+            if tok == "SUB":
+                operators.append(NEG)
+                continue
+            if tok == "LPAREN":
+                operators.append(GROUP)
+                continue
+            if tok == "FUN":
+                if i >= n or toks[i][0] != "LPAREN":
+                    raise ParseError("Invalid syntax")
+                i += 1
+                operators.append(FunctionCall(value))
+                continue
+            if tok == "USER_FUN":
+                if i >= n or toks[i][0] != "LPAREN":
+                    raise ParseError(f"Unknown variable {value}")
+                if value not in user_functions:
+                    raise ParseError(f"Unknown function {value}")
+                i += 1
+                operators.append(FunctionCall(value))
+                continue
+            if tok == "CONST":
+                operands.append(Value(constants[value]))
+            elif tok == "VAR" and params is not None:
+                if value not in params:
+                    raise ParseError(f"Unknown variable {value}")
+                operands.append(Value(params[value]))
+            elif tok == "VAR":
+                if samples is None:
+                    samples = default_samples()
+                operands.append(Value(samples))
+                graph_mode = True
+            elif tok == "NUM":
+                operands.append(Value(convert_to_number(value)))
+            else:
+                raise ParseError("Invalid syntax")
+        elif tok in binops:
+            prec, right_assoc = binops[tok]
+            reduce(prec + 1 if right_assoc else prec)
+            operators.append(tok)
+            expect_operand = True
+            continue
+        elif tok == "FACT" and fact_allowed:
+            operands.append(Function("fact", (operands.pop(),)))
+            fact_allowed = False
+            continue
+        elif tok == "COMMA" or tok == "RPAREN":
+            reduce(0)
+            if not operators:
+                raise ParseError("Invalid syntax")
+            top = operators[-1]
+            if top is GROUP:
+                if tok == "COMMA":
+                    raise ParseError("Invalid syntax")
+                operators.pop()
+            else:
+                top.exprs.append(operands.pop())
+                num_params = Function.num_params[top.fun]
+                if tok == "COMMA":
+                    if len(top.exprs) >= num_params:
+                        raise ParseError("Invalid syntax")
+                    expect_operand = True
+                    continue
+                if len(top.exprs) != num_params:
+                    raise ParseError("Invalid syntax")
+                operators.pop()
+                operands.append(Function(top.fun, tuple(top.exprs)))
+        else:
+            raise ParseError("Invalid syntax")
+        complete_primary()
+        expect_operand = False
+        fact_allowed = True
+
+    if expect_operand:
         raise ParseError("Invalid syntax")
-    return toks[1:]
-     
-def parse_primary(toks):
-    if not toks:
+    reduce(0)
+    if operators:
         raise ParseError("Invalid syntax")
-    tok = toks[0]
-    if tok[0] == "LPAREN":
-        toks_left, expr, graph_mode = parse_additive(toks[1:])
-        toks_left = match_tok("RPAREN", toks_left)
-        return toks_left, expr, graph_mode
-    if tok[0] == "FUN":
-        toks_left = match_tok("LPAREN", toks[1:])
-        exprs = []
-        graph_mode = False
-        for i in range(Function.num_params[tok[1]]):
-            if i > 0:
-                toks_left = match_tok("COMMA", toks_left)
-            toks_left, expr, gm = parse_additive(toks_left)
-            exprs.append(expr)
-            graph_mode |= gm
-        toks_left = match_tok("RPAREN", toks_left)
-        return toks_left, Function(tok[1], exprs), graph_mode
-    if tok[0] == "CONST":
-        return toks[1:], Value(constants[tok[1]]), False
-    if tok[0] == "VAR":
-        return toks[1:], Value(np.linspace(*calc.DOMAIN, num=calc.NUM_SAMPLES)), True
-    if tok[0] == "NUM":
-        return toks[1:], Value(convert_to_number(tok[1])), False
-    if tok[0] == "SUB":
-        toks_left, expr, graph_mode = parse_primary(toks[1:])
-        expr.neg = -1
-        return toks_left, expr, graph_mode
-    raise ParseError("Invalid syntax")
-
-def parse_factorial(toks):
-    toks, expr, graph_mode = parse_primary(toks)
-    if not toks or toks[0][0] != "FACT":
-        return toks, expr, graph_mode
-    return toks[1:], Function("fact", [expr]), graph_mode
-
-def parse_exponential(toks):
-    toks1, expr1, graph_mode1 = parse_factorial(toks)
-    if not toks1 or toks1[0][0] != "POW":
-        return toks1, expr1, graph_mode1
-    toks2, expr2, graph_mode2 = parse_exponential(toks1[1:])
-    return toks2, Binop("POW", expr1, expr2), graph_mode1 or graph_mode2
-
-def parse_multiplicitive(toks):
-    toks1, expr1, graph_mode1 = parse_exponential(toks)
-    if not toks1 or toks1[0][0] != "MULT" and toks1[0][0] != "DIV" and toks1[0][0] != "MOD":
-        return toks1, expr1, graph_mode1
-    toks2, expr2, graph_mode2 = parse_multiplicitive(toks1[1:])
-    return toks2, Binop(toks1[0][0], expr1, expr2), graph_mode1 or graph_mode2
-
-def parse_additive(toks):
-    toks1, expr1, graph_mode1 = parse_multiplicitive(toks)
-    if not toks1 or toks1[0][0] != "ADD" and toks1[0][0] != "SUB":
-        return toks1, expr1, graph_mode1
-    op = "ADD" if toks1[0][0] == "ADD" else "SUB"
-    toks2, expr2, graph_mode2 = parse_additive(toks1[1:])
-    return toks2, Binop(op, expr1, expr2), graph_mode1 or graph_mode2
+    return operands[0], graph_mode
 
 # Makes implied multiplication explicit (e.g. (2)(2) -> (2) * (2) or 5pi -> 5 * pi).
-def preprocess(toks):
+# Parameters of a user-defined function are treated like x, so a(a + 1) is a * (a + 1).
+def preprocess(toks, params=()):
+    if params:
+        toks = [("VAR", value) if token == "USER_FUN" and value in params else (token, value)
+                for token, value in toks]
     new_toks = []
     for i, (token, value) in enumerate(toks):
         if token in {"RPAREN", "FACT", "CONST", "VAR", "NUM"} and \
-                (i < len(toks) - 1 and toks[i + 1][0] in {"LPAREN", "FUN", "CONST", "VAR", "NUM"}):
+                (i < len(toks) - 1 and toks[i + 1][0] in {"LPAREN", "FUN", "CONST", "VAR", "NUM", "USER_FUN"}):
             new_toks.append((token, value))
             new_toks.append(("MULT", None))
         else:
@@ -276,9 +692,53 @@ def preprocess(toks):
         
     return new_toks
     
-def parse(toks):
-    toks = preprocess(toks)
-    toks_left, expr, graph_mode = parse_additive(toks)
-    if toks_left:
-        raise ParseError("Invalid syntax")
-    return expr, graph_mode
\ No newline at end of file
+def parse(toks, samples=None):
+    return parse_expression(preprocess(toks), samples)
+
+# Defines (or redefines) a function from the tokens of a line like f(a, b) = a^2 + b,
+# returning it. The body may call the function itself and any already defined.
+def define(toks):
+    if len(toks) < 5 or toks[0][0] != "USER_FUN" or toks[1][0] != "LPAREN":
+        raise ParseError("Invalid function definition")
+    name = toks[0][1]
+    # Built-in functions the lexer doesn't know by name, like fact (written n!)
+    if name in Function.functions and name not in user_functions:
+        raise ParseError(f"Cannot redefine {name}")
+    params = {}
+    i = 2
+    while i + 1 < len(toks) and toks[i][0] in ("USER_FUN", "VAR") and toks[i][1] not in params:
+        params[toks[i][1]] = Param(toks[i][1], len(params))
+        if toks[i + 1][0] == "RPAREN":
+            break
+        if toks[i + 1][0] != "COMMA":
+            raise ParseError("Invalid function definition")
+        i += 2
+    else:
+        raise ParseError("Invalid function definition")
+    i += 2
+    if i >= len(toks) or toks[i][0] != "EQUAL":
+        raise ParseError("Invalid function definition")
+
+    fun = user_functions.get(name) or UserFunction(name)
+    # Registered with its new parameter count while the body is parsed so that it
+    # can call itself, and put back as it was if the body doesn't parse
+    previous = (user_functions.get(name), Function.functions.get(name), Function.num_params.get(name))
+    user_functions[name] = Function.functions[name] = fun
+    Function.num_params[name] = len(params)
+    try:
+        body, _ = parse_expression(preprocess(toks[i + 1:], params), params=params)
+    except ParseError:
+        for table, old in zip((user_functions, Function.functions, Function.num_params), previous):
+            if old is None:
+                del table[name]
+            else:
+                table[name] = old
+        raise
+    import calc_optimizer as co
+    import calc_compiler as cc
+    fun.params = list(params.values())
+    fun.body = co.share(co.optimize(body))
+    fun.compiled = cc.compile_expr(fun.body, fun.params)
+    # Other functions' memos may hold results that called the old definition
+    clear_memos()
+    return fun
\ No newline at end of file
@@ -0,0 +1,172 @@
+import sys
+import time
+from contextlib import contextmanager
+import calc_lexer as cl
+import calc_parser as cp
+
+# Opt-in instrumentation of where evaluating expressions spends its time. enable()
+# swaps timing wrappers in for the functions of each phase and for the evaluate
+# methods of Value, Function and Binop; disable() puts the originals back, so while
+# profiling is off nothing is added to any call. The calculator's
+# "profile <expr>" command uses profile_line; from Python:
+#   with calc_profile.profiling() as profile:
+#       ...
+#   print(profile.report())
+# Nodes are only timed when evaluated as trees, not through calc_compiler or
+# calc_inplace, whose time is counted under the graph phase.
+
+# (phase, module, function) wrapped by enable
+phase_functions = [
+    ("tokenize", cl, "tokenize"),
+    ("preprocess", cp, "preprocess"),
+    ("parse", cp, "parse_expression"),
+]
+node_classes = [cp.Value, cp.Function, cp.Binop]
+
+class Profile:
+    def __init__(self):
+        self.phases = {} # phase -> [calls, seconds]
+        self.running = set()
+        # Stack of node labels joined by ";", starting at "evaluate" ->
+        # [calls, seconds not spent in child nodes, array elements, array bytes]
+        self.nodes = {}
+        self.path = []
+        self.child_time = []
+
+    def add_phase(self, phase, seconds):
+        stats = self.phases.setdefault(phase, [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+
+    # Times the block as a call of phase, unless it runs inside that phase already
+    @contextmanager
+    def phase(self, phase):
+        if phase in self.running:
+            yield
+            return
+        self.running.add(phase)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.running.discard(phase)
+            self.add_phase(phase, time.perf_counter() - start)
+
+    def add_node(self, stack, seconds, result):
+        stats = self.nodes.setdefault(stack, [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += seconds
+        if cp.isarray(result):
+            stats[2] += result.size
+            stats[3] += result.nbytes
+
+    # Folded stacks, one "phase;node;node microseconds" line per stack, for
+    # flamegraph.pl, speedscope and similar tools
+    def folded(self):
+        lines = [f"{phase} {round(seconds * 1e6)}" for phase, (_, seconds) in self.phases.items()
+                 if phase != "evaluate"]
+        lines += [f"{stack} {round(seconds * 1e6)}" for stack, (_, seconds, _, _) in self.nodes.items()]
+        return "\n".join(lines)
+
+    def report(self):
+        lines = [f"{'phase':<12} {'calls':>8} {'total (us)':>12}"]
+        for phase, (calls, seconds) in self.phases.items():
+            lines.append(f"{phase:<12} {calls:>8,} {seconds * 1e6:>12,.1f}")
+        if self.nodes:
+            width = max(len(stack) for stack in self.nodes)
+            lines.append(f"\n{'node':<{width}} {'calls':>8} {'self (us)':>12} {'elements':>12} {'bytes':>12}")
+            for stack, (calls, seconds, elements, nbytes) in \
+                    sorted(self.nodes.items(), key=lambda item: -item[1][1]):
+                lines.append(f"{stack:<{width}} {calls:>8,} {seconds * 1e6:>12,.1f} {elements:>12,} {nbytes:>12,}")
+        return "\n".join(lines)
+
+# The Profile being recorded to, and the functions enable replaced
+active = None
+originals = []
+
+def label(node):
+    if isinstance(node, cp.Value):
+        return "x" if cp.isarray(node.val) else "Value"
+    return node.fun if isinstance(node, cp.Function) else node.op
+
+def timed_phase(phase, fun):
+    def timed(*args, **kwargs):
+        with active.phase(phase):
+            return fun(*args, **kwargs)
+    return timed
+
+# Times a node's evaluate, less the time of the child nodes it evaluates. The
+# outermost node of each tree also counts as a call of the evaluate phase.
+def timed_evaluate(evaluate):
+    def timed(node):
+        profile = active
+        if not profile.path:
+            profile.path.append("evaluate")
+        profile.path.append(label(node))
+        profile.child_time.append(0.0)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = evaluate(node)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            profile.add_node(";".join(profile.path), elapsed - profile.child_time.pop(), result)
+            profile.path.pop()
+            if profile.child_time:
+                profile.child_time[-1] += elapsed
+            else:
+                profile.path.pop()
+                profile.add_phase("evaluate", elapsed)
+    return timed
+
+def enable(profile=None):
+    global active
+    if active is not None:
+        raise ValueError("Already profiling")
+    active = profile or Profile()
+    targets = list(phase_functions)
+    # calc_inplace evaluates graphs; only wrapped if something has imported it
+    if "calc_inplace" in sys.modules:
+        targets.append(("graph", sys.modules["calc_inplace"], "evaluate_all"))
+    for phase, module, name in targets:
+        fun = getattr(module, name)
+        originals.append((module, name, fun))
+        setattr(module, name, timed_phase(phase, fun))
+    for cls in node_classes:
+        originals.append((cls, "evaluate", cls.evaluate))
+        cls.evaluate = timed_evaluate(cls.evaluate)
+    return active
+
+def disable():
+    global active
+    while originals:
+        setattr(*originals.pop())
+    profile, active = active, None
+    return profile
+
+@contextmanager
+def profiling(profile=None):
+    profile = enable(profile)
+    try:
+        yield profile
+    finally:
+        disable()
+
+# Profiles one line from tokenizing to its result: parsed without the parse cache,
+# evaluated as a tree so each node is timed, then graphed with graph(expr) or
+# formatted with format(value), both timed as phases. Returns the Profile.
+def profile_line(line, ans, graph, format):
+    with profiling() as profile:
+        toks = cl.tokenize(line, ans)
+        if not toks:
+            raise cp.ParseError("Invalid syntax")
+        expr, graph_mode = cp.parse(toks)
+        value = expr.evaluate()
+        if graph_mode:
+            phase, fun, arg = "graph", graph, expr
+        else:
+            phase, fun, arg = "format", format, value
+        with profile.phase(phase):
+            fun(arg)
+    return profile
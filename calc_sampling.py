@@ -0,0 +1,223 @@
+import numpy as np
+import calc_parser as cp
+import calc_inplace as ci
+import calc_optimizer as co
+
+# Streaming evaluation of graph-mode expressions. Instead of evaluating the tree over
+# all of the samples at once, the domain is sampled in fixed-size chunks and each
+# chunk is evaluated and handed to a consumer, so memory use depends on the chunk
+# size rather than the number of samples. Trees meant for streaming should be parsed
+# with a placeholder array for x (cp.unbound_samples(), as the parse cache does) so
+# the full sample array is never built.
+
+CHUNK_SIZE = 1 << 16
+ADAPTIVE_INITIAL = 129 # evenly spaced points adaptive sampling starts from
+ADAPTIVE_DEPTH = 12 # maximum number of times an initial interval is halved
+ADAPTIVE_TOL = 1e-3 # allowed error at an interval's midpoint, relative to the curve's height
+GAP_JUMP = 0.05 # jump across a fully refined interval, relative to the height, treated as a gap
+
+# Yields consecutive pieces of np.linspace(*domain, num=num_samples), computed the
+# same way so that concatenating them gives exactly the same array
+def chunks(domain, num_samples, chunk_size=CHUNK_SIZE):
+    start, stop = domain
+    if num_samples == 1:
+        yield np.array([start], dtype=float)
+        return
+    step = (stop - start) / (num_samples - 1)
+    for i in range(0, num_samples, chunk_size):
+        j = min(i + chunk_size, num_samples)
+        x = np.arange(i, j, dtype=float)
+        x *= step
+        x += start
+        if j == num_samples:
+            x[-1] = stop
+        yield x
+
+# Returns a copy of expr with x bound to samples. x is the only array-valued Value
+# in a parsed tree. Nodes shared in a DAG stay shared.
+def bind(expr, samples):
+    new_nodes = {}
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if id(node) in new_nodes:
+            results.append(new_nodes[id(node)])
+            continue
+        if isinstance(node, cp.Value):
+            new = node
+            if isinstance(node.val, np.ndarray):
+                new = cp.Value(samples)
+                new.neg = node.neg
+        elif not visited:
+            stack.append((node, True))
+            children = node.exprs if isinstance(node, cp.Function) else [node.expr1, node.expr2]
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        elif isinstance(node, cp.Function):
+            n = len(node.exprs)
+            new = cp.Function(node.fun, tuple(results[-n:]))
+            del results[-n:]
+            new.neg = node.neg
+        else:
+            expr2 = results.pop()
+            expr1 = results.pop()
+            new = cp.Binop(node.op, expr1, expr2)
+            new.neg = node.neg
+        new_nodes[id(node)] = new
+        results.append(new)
+    return results[0]
+
+# The array x is bound to in expr, or None if expr doesn't use x
+def samples_of(expr):
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, cp.Value):
+            if isinstance(node.val, np.ndarray):
+                return node.val
+        elif isinstance(node, cp.Function):
+            stack.extend(node.exprs)
+        else:
+            stack.extend((node.expr1, node.expr2))
+    return None
+
+# Evaluates expr over num_samples evenly spaced points of domain, calling
+# consumer(x, y) with each chunk in order. Consumers that keep the arrays rather than
+# reducing or writing them out give up the constant memory use. Expressions that
+# don't depend on x give a y array of their value repeated.
+def stream(expr, consumer, domain, num_samples, chunk_size=CHUNK_SIZE):
+    stream_all([expr], [consumer], domain, num_samples, chunk_size)
+
+# Like stream for several expressions, each with its consumer. Each chunk is
+# evaluated for all of them together, with their common subexpressions shared.
+def stream_all(exprs, consumers, domain, num_samples, chunk_size=CHUNK_SIZE):
+    for x in chunks(domain, num_samples, chunk_size):
+        ys = ci.evaluate_all(co.share_all([bind(expr, x) for expr in exprs]))
+        for consumer, y in zip(consumers, ys):
+            consumer(x, np.broadcast_to(y, x.shape))
+
+# Evaluates expr at the points in x, with non-finite results as nan. Expressions
+# that don't depend on x evaluate to a single number, which is repeated for each point.
+def evaluate_at(expr, x):
+    with np.errstate(all="ignore"):
+        y = np.array(np.broadcast_to(ci.evaluate(bind(expr, x)), x.shape), dtype=float)
+    y[~np.isfinite(y)] = np.nan
+    return y
+
+# Samples expr over domain by recursive subdivision: starting from an even grid, an
+# interval is halved while the curve at its midpoint is further than ADAPTIVE_TOL
+# (relative to the curve's height) from the straight line between its ends, or the
+# curve is defined at only some of the three points, unless the half is far above or
+# below the rest of the curve. Each round of subdivision is a
+# single evaluation over all of the new midpoints. Intervals still failing after
+# ADAPTIVE_DEPTH rounds with a large jump across them (poles like those of tan(x), or
+# steps) get a nan point in the middle so they are drawn as gaps.
+# Returns (x, y, number of points evaluated).
+def adaptive(expr, domain, initial=ADAPTIVE_INITIAL, depth=ADAPTIVE_DEPTH, tol=ADAPTIVE_TOL):
+    x = np.linspace(*domain, num=initial)
+    y = evaluate_at(expr, x)
+    evaluations = initial
+    finite = y[np.isfinite(y)]
+    # Percentiles so that the values near a pole don't set the scale
+    low, high = np.percentile(finite, [1, 99]) if finite.size else (0, 0)
+    height = high - low if high > low else 1
+    # Intervals entirely above or below this band are off the interesting part of
+    # the plot and aren't refined
+    low, high = low - height, high + height
+    refine = np.ones(initial - 1, dtype=bool)
+    gaps = np.empty(0)
+    for level in range(depth + 1):
+        left = np.flatnonzero(refine)
+        if not left.size:
+            break
+        mid_x = (x[left] + x[left + 1]) / 2
+        if level == depth:
+            jump = np.abs(y[left + 1] - y[left]) > GAP_JUMP * height
+            gaps = mid_x[jump]
+            break
+        mid_y = evaluate_at(expr, mid_x)
+        evaluations += mid_x.size
+        x = np.insert(x, left + 1, mid_x)
+        y = np.insert(y, left + 1, mid_y)
+        mid = left + 1 + np.arange(left.size)
+        y_left, y_right = y[mid - 1], y[mid + 1]
+        error = np.abs(mid_y - (y_left + y_right) / 2)
+        defined = np.isfinite(y_left), np.isfinite(mid_y), np.isfinite(y_right)
+        split = (error > tol * height) | (defined[0] != defined[1]) | (defined[1] != defined[2])
+        off_view = (np.minimum(y_left, mid_y) > high) | (np.maximum(y_left, mid_y) < low), \
+            (np.minimum(mid_y, y_right) > high) | (np.maximum(mid_y, y_right) < low)
+        refine = np.zeros(x.size - 1, dtype=bool)
+        refine[mid - 1] = split & ~off_view[0]
+        refine[mid] = split & ~off_view[1]
+    at = np.searchsorted(x, gaps)
+    return np.insert(x, at, gaps), np.insert(y, at, np.nan), evaluations
+
+# Reduces sorted samples to at most target points for plotting. The x range is split
+# into equal-width buckets (think pixel columns) and each bucket keeps only its
+# lowest and highest points, plus its first nan so gaps stay gaps. The first and last
+# samples are always kept.
+def downsample(x, y, target):
+    if x.size <= target:
+        return x, y
+    keep = extremes(x, y, bucket_edges(x[0], x[-1], target, np.isnan(y).any()))
+    return x[keep], y[keep]
+
+# Edges of the buckets downsample splits [start, stop] into, fewer when the curve has
+# gaps since their buckets keep up to three points
+def bucket_edges(start, stop, target, gaps):
+    num_buckets = max((target - 2) // (3 if gaps else 2), 1)
+    return np.linspace(start, stop, num=num_buckets + 1)
+
+# Indices of the points downsample keeps from sorted samples lying within edges: the
+# first and last, and the first lowest, first highest and first nan point of each
+# bucket. The samples may be only part of the curve, covering some of the buckets.
+def extremes(x, y, edges):
+    n = x.size
+    nan = np.isnan(y)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    starts = starts[starts < n]
+    bucket = np.repeat(np.arange(starts.size), np.diff(np.append(starts, n)))
+    low = np.where(nan, np.inf, y)
+    high = np.where(nan, -np.inf, y)
+
+    # Index of the first point in each bucket for which mask is true
+    def first(mask):
+        i = np.flatnonzero(mask)
+        return i[np.diff(bucket[i], prepend=-1) != 0]
+
+    return np.unique(np.concatenate((
+        [0, n - 1],
+        first(low == np.minimum.reduceat(low, starts)[bucket]),
+        first(high == np.maximum.reduceat(high, starts)[bucket]),
+        first(nan)
+    )))
+
+# A stream consumer downsampling the curve as it arrives, giving the same points as
+# downsample on the whole curve. Each chunk is reduced to the points downsample
+# could keep from it: whether the curve has gaps, and so the number of buckets,
+# isn't known until the end, so the points for both bucket counts are kept.
+class Downsampler:
+    def __init__(self, domain, num_samples, target):
+        self.target = target
+        self.edges = None
+        if num_samples > target:
+            self.edges = [bucket_edges(*domain, target, gaps) for gaps in (False, True)]
+        self.x = []
+        self.y = []
+
+    def __call__(self, x, y):
+        if self.edges is not None:
+            keep = np.unique(np.concatenate([extremes(x, y, edges) for edges in self.edges]))
+            x, y = x[keep], y[keep]
+        self.x.append(x)
+        self.y.append(y)
+
+    # The downsampled (x, y), once every chunk has been consumed
+    def result(self):
+        x = np.concatenate(self.x)
+        y = np.concatenate(self.y)
+        if self.edges is None:
+            return x, y
+        keep = extremes(x, y, bucket_edges(x[0], x[-1], self.target, np.isnan(y).any()))
+        return x[keep], y[keep]
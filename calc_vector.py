@@ -0,0 +1,54 @@
+import numpy as np
+import calc_lexer as cl
+import calc_parser as cp
+import calc_optimizer as co
+import calc_inplace as ci
+import calc_sampling as cs
+
+# Library API for evaluating one expression over data of your own, e.g. a column of
+# measurements, instead of the graph domain:
+#   expr = calc_vector.parse("3x^2 + sin(x)")
+#   y = calc_vector.evaluate(expr, measurements)
+#   calc_vector.evaluate_npy(expr, "x.npy", "y.npy")
+# The expression is parsed once and x is rebound to one chunk of the data at a time,
+# so the only memory used beyond the input and output arrays is for a chunk's
+# intermediate results. Inputs are chunked along their first axis.
+
+# Parses line into a tree that can be evaluated over any array bound to x
+def parse(line, ans=None):
+    toks = cl.tokenize(line, ans)
+    if not toks:
+        raise cp.ParseError("Empty expression")
+    expr, _ = cp.parse(toks, np.empty(0))
+    return co.share(co.optimize(expr))
+
+# Evaluates expr with x bound to each element of x, writing the results into out
+# (allocated with the dtype of the first chunk's result if not given) and returning
+# it. out may be the same array as x. Invalid operations on array elements give
+# inf/nan as in graphs; errors that don't depend on x, like 1/0, are raised.
+def evaluate(expr, x, out=None, chunk_size=cs.CHUNK_SIZE):
+    x = np.asanyarray(x)
+    if x.ndim == 0:
+        x = x.reshape(1)
+    for i in range(0, max(len(x), 1), chunk_size):
+        with np.errstate(all="ignore"):
+            y = ci.evaluate(cs.bind(expr, x[i:i + chunk_size]))
+        if out is None:
+            out = np.empty(x.shape, dtype=np.result_type(y))
+        out[i:i + chunk_size] = y
+    return out
+
+# Evaluates expr over the array saved in the .npy file at path, which is memory
+# mapped rather than read in. With out_path the results are written to a memory
+# mapped .npy file there too, so neither array has to fit in memory.
+def evaluate_npy(expr, path, out_path=None, chunk_size=cs.CHUNK_SIZE):
+    x = np.load(path, mmap_mode="r")
+    out = None
+    if out_path is not None:
+        # The result's dtype, from evaluating the first element
+        dtype = np.result_type(evaluate(expr, x[:1]))
+        out = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=x.shape)
+    out = evaluate(expr, x, out, chunk_size)
+    if out_path is not None:
+        out.flush()
+    return out
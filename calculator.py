@@ -1,28 +1,114 @@
-import numpy as np
-import plotly.graph_objects as go
+import argparse
+import sys
+import time
+from collections import deque
+from pathlib import Path
 import calc_lexer as cl
 import calc_parser as cp
+import calc_cache
 
 # TODO
-# 6/2(1+2) should equal 9 not 1
-    # parser is right associative, making it left associative might be difficult
 # complex numbers
-# add ability to create functions on the fly e.g. f(x) = 10x,
-#   will need to remove graphing or change how it is called
 
 ROUND_THRESH = 1.0e-12
 NUM_SAMPLES = 1000
 DOMAIN = (-10, 10)
 COMMAS = True
+ADAPTIVE = False # sample graphs adaptively instead of at NUM_SAMPLES even steps
+PLOT_POINTS = 4000 # most points handed to plotly per graph
+BATCH_CHUNK = 10_000 # results buffered before each write in batch mode
+PARSE_CACHE_SIZE = 256
+# Longest whole number shown. Converting to text takes time quadratic in the number of
+# digits, about half a second for fib(10^6)'s 208,988.
+MAX_DIGITS = 300_000
 ans = None
+parse_cache = calc_cache.ParseCache(PARSE_CACHE_SIZE)
 
-def graph(expr):
-    y = expr.evaluate()
-    x = np.linspace(*DOMAIN, num=NUM_SAMPLES)
-    trace = go.Scatter(x=x, y=y)
+# Python refuses to convert ints past 4300 digits to or from text by default. The
+# limit is interpreter-wide, so it's only raised to MAX_DIGITS when running as the
+# program, in its process and its batch workers.
+def allow_digits():
+    sys.set_int_max_str_digits(MAX_DIGITS)
+
+def error_message(e):
+    if isinstance(e, OverflowError):
+        return "Calculation too large"
+    if isinstance(e, ZeroDivisionError):
+        return "Undefined"
+    if isinstance(e, RecursionError):
+        return "Recursion too deep"
+    return str(e)
+
+# Evaluates a graph-mode expression, returning the (x, y) points of its curve.
+# The graphing modules need numpy, so they are imported only once something is graphed.
+# Expressions whose value doesn't depend on x, like m(x) for m(a) = 1, give flat lines.
+def sample_graph(expr):
+    import numpy as np
+    import calc_inplace as ci
+    import calc_sampling as cs
+    if ADAPTIVE:
+        x, y, _ = cs.adaptive(expr, DOMAIN)
+    else:
+        x = cp.default_samples()
+        y = np.broadcast_to(ci.evaluate(cs.bind(expr, x)), x.shape)
+    return x, y
+
+# Parses the graph-mode expressions in lines
+def parse_graphs(lines):
+    exprs = []
+    for line in lines:
+        parsed = parse_cache.parse(line, ans)
+        if parsed is None:
+            raise cp.ParseError("Invalid syntax")
+        exprs.append(parsed[0])
+    return exprs
+
+# Samples several expressions for graphing together, returning (x, y) for each.
+# Without adaptive sampling they are all evaluated over the same samples of x (see
+# calc_parser.default_samples), with common subexpressions shared between them so
+# that those are computed once. Expressions without x give flat lines, with adaptive
+# sampling too.
+def sample_graphs(lines):
+    import numpy as np
+    import calc_inplace as ci
+    import calc_optimizer as co
+    import calc_sampling as cs
+    exprs = parse_graphs(lines)
+    if ADAPTIVE:
+        curves = []
+        for expr in exprs:
+            x, y, _ = cs.adaptive(expr, DOMAIN)
+            curves.append((x, y))
+        return curves
+    x = cp.default_samples()
+    ys = ci.evaluate_all(co.share_all([cs.bind(expr, x) for expr in exprs]))
+    return [(x, np.broadcast_to(y, x.shape)) for y in ys]
+
+# The (x, y) points to plot for each expression, at most PLOT_POINTS per curve. Like
+# sample_graphs, but without adaptive sampling the curves are evaluated a chunk of
+# samples at a time and downsampled as they go (see calc_sampling.stream_all), so
+# memory use doesn't grow with NUM_SAMPLES.
+def plot_graphs(exprs):
+    import calc_sampling as cs
+    if ADAPTIVE:
+        return [cs.downsample(*cs.adaptive(expr, DOMAIN)[:2], PLOT_POINTS) for expr in exprs]
+    downsamplers = [cs.Downsampler(DOMAIN, NUM_SAMPLES, PLOT_POINTS) for _ in exprs]
+    cs.stream_all(exprs, downsamplers, DOMAIN, NUM_SAMPLES)
+    return [downsampler.result() for downsampler in downsamplers]
+
+# Builds one plotly figure from (name, x, y) curves, downsampling each to
+# PLOT_POINTS. Names are shown in a legend when there's more than one curve.
+def figure(curves):
+    # plotly is slow to import and only needed here
+    import plotly.graph_objects as go
+    import calc_sampling as cs
+    traces = []
+    for name, x, y in curves:
+        x, y = cs.downsample(x, y, PLOT_POINTS)
+        traces.append(go.Scatter(x=x, y=y, name=name))
     
     layout = go.Layout(
-        showlegend=False,
+        showlegend=len(traces) > 1,
         xaxis_showline=True,
         yaxis_showline=True,
         xaxis_zeroline=True,
@@ -35,22 +121,53 @@ def graph(expr):
         yaxis_showgrid=True,
     )
     
-    fig = go.Figure(data=[trace], layout=layout)
-    fig.show()
+    return go.Figure(data=traces, layout=layout)
+
+def graph(expr):
+    figure([(None, *plot_graphs([expr])[0])]).show()
+
+# Graphs the expressions separated by ; in line (e.g. sin(x); cos(x); sin(x)cos(x))
+# in one figure
+def graph_all(line):
+    lines = [expr.strip() for expr in line.split(";") if expr.strip()]
+    figure([(expr, x, y) for expr, (x, y) in zip(lines, plot_graphs(parse_graphs(lines)))]).show()
+
+# Returns (text shown for val, val rounded to a whole number if within round_thresh)
+def format_number(val, round_thresh, commas):
+    if abs(val - round(val)) <= round_thresh:
+        val = round(val)
+    try:
+        return (f"{val:,}" if commas else str(val)), val
+    except ValueError: # more digits than allowed, MAX_DIGITS when run as the program
+        raise OverflowError from None
+
+def format_value(val):
+    return format_number(val, ROUND_THRESH, COMMAS)
 
 def interpret(expr, graph_mode):
     if graph_mode:
         graph(expr)
     else:
-        val = expr.evaluate()
-        if abs(val - round(val)) <= ROUND_THRESH:
-            val = round(val)
-        print(f"{val:,}" if COMMAS else val)
+        text, val = format_value(cp.evaluate(expr))
+        print(text)
         return val
 
+# Profiles evaluating line (see calc_profile), printing the time taken by each phase
+# and node followed by folded stacks for flame graph tools. Graphs are built but not
+# shown.
+def profile(line):
+    import calc_profile
+    result = calc_profile.profile_line(line, ans, lambda expr: figure([(None, *plot_graphs([expr])[0])]),
+                                       format_value)
+    print(result.report())
+    print("\nFolded stacks:")
+    print(result.folded())
+
 def configure():
     print("Edit graph DOMAIN (domain), number of samples to take for x (samples),")
-    print("rounding threshold (thresh), or toggle commas (commas)?\n> ", end="")
+    print("most points to plot (points), rounding threshold (thresh), parse cache size (cache)")
+    print("or function memo size (memo), or toggle commas (commas) or adaptive sampling (adaptive)?")
+    print(f"Parse cache: {parse_cache}\n> ", end="")
     arg = input()
     if arg == "domain":
         print("Min x = ", end="")
@@ -72,6 +189,14 @@ def configure():
         else:
             global NUM_SAMPLES
             NUM_SAMPLES = int(arg)
+    elif arg == "points":
+        print("New maximum number of points to plot = ", end="")
+        arg = input()
+        if not arg.isnumeric() or int(arg) < 8:
+            print("Invalid input")
+        else:
+            global PLOT_POINTS
+            PLOT_POINTS = int(arg)
     elif arg == "thresh":
         print("New rounding threshold = ", end="")
         arg = input()
@@ -80,12 +205,39 @@ def configure():
             ROUND_THRESH = float(arg)
         except:
             print("Invalid input")
+    elif arg == "cache":
+        print("New parse cache size = ", end="")
+        arg = input()
+        if not arg.isnumeric():
+            print("Invalid input")
+        else:
+            global PARSE_CACHE_SIZE
+            PARSE_CACHE_SIZE = int(arg)
+            parse_cache.resize(PARSE_CACHE_SIZE)
+    elif arg == "memo":
+        print("New number of calls remembered per function = ", end="")
+        arg = input()
+        if not arg.isnumeric():
+            print("Invalid input")
+        else:
+            cp.USER_MEMO_SIZE = int(arg)
+            cp.clear_memos()
     elif arg == "commas":
         global COMMAS
         COMMAS = not COMMAS
         print("Commas now", "on" if COMMAS else "off")
+    elif arg == "adaptive":
+        global ADAPTIVE
+        ADAPTIVE = not ADAPTIVE
+        print("Adaptive sampling now", "on" if ADAPTIVE else "off")
 
 
+# Defines a function from line (see calc_parser.define). Cached trees calling it
+# were parsed against its old definition, so the parse cache is cleared.
+def define(line, ans):
+    cp.define(cl.tokenize(line, ans))
+    parse_cache.clear()
+
 def process_input(line):
     if line == "exit" or line == "quit":
         return False
@@ -96,17 +248,208 @@ def process_input(line):
         return True
     try:
         global ans
-        toks = cl.tokenize(line, ans)
-        if not toks:
+        if line.startswith("profile "):
+            profile(line[len("profile "):])
+            return True
+        if "=" in line:
+            define(line, ans)
+            return True
+        if ";" in line:
+            graph_all(line)
             return True
-        expr, graph_mode = cp.parse(toks)
+        parsed = parse_cache.parse(line, ans)
+        if parsed is None:
+            return True
+        expr, graph_mode = parsed
         ans = interpret(expr, graph_mode)
-    except (ValueError, TypeError, cp.ParseError, OverflowError) as e:
-        if isinstance(e, OverflowError):
-            e = "Calculation too large"
-        print("Error:", e)
+    except (ValueError, TypeError, cp.ParseError, OverflowError, ZeroDivisionError, RecursionError) as e:
+        print("Error:", error_message(e))
     return True
 
+# Evaluates a single batch line, returning (output line, new ans value). The value is
+# None when the line is empty, fails or defines a function, in which case ans is left
+# unchanged. Definitions output an empty line.
+def evaluate_line(line, ans, round_thresh, commas):
+    try:
+        if "=" in line:
+            define(line, ans)
+            return "", None
+        parsed = parse_cache.parse(line, ans)
+        if parsed is None:
+            return "", None
+        expr, graph_mode = parsed
+        if graph_mode:
+            raise ValueError("Graphing is not supported in batch mode")
+        return format_number(cp.evaluate(expr), round_thresh, commas)
+    except (ValueError, TypeError, cp.ParseError, OverflowError, ZeroDivisionError, RecursionError) as e:
+        return "Error: " + error_message(e), None
+
+def read_chunks(infile, size):
+    chunk = []
+    for line in infile:
+        line = line.strip()
+        if line == "exit" or line == "quit":
+            break
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Number of the batch's definition lines this worker process has run. Chunks reach
+# each worker in input order, so it only has to catch up on those it hasn't seen.
+definitions_run = 0
+
+# Lines that mention ans depend on the previous result, so they are left for the
+# parent process to evaluate in order. Returns None in their place. Function
+# definitions are run after the definitions from earlier chunks this process hasn't
+# run. A definition using ans can't be, so everything from it on is left for the
+# parent.
+def evaluate_chunk(lines, round_thresh, commas, definitions=()):
+    global definitions_run
+    if definitions_run > len(definitions):
+        # Already past this chunk's definitions, which can't be undone
+        return [None] * len(lines)
+    for line in definitions[definitions_run:]:
+        evaluate_line(line, None, round_thresh, commas)
+    definitions_run = len(definitions)
+    results = []
+    for line in lines:
+        if "=" in line:
+            if "ans" in line:
+                break
+            results.append(evaluate_line(line, None, round_thresh, commas))
+            definitions_run += 1
+        else:
+            results.append(None if "ans" in line else evaluate_line(line, None, round_thresh, commas))
+    return results + [None] * (len(lines) - len(results))
+
+# Evaluates every line of infile and writes one output line per input line to outfile,
+# chaining ans between lines like the interactive loop does. Errors are written in
+# place of the result and don't stop the run. With more than one worker, chunks of
+# lines are evaluated in a process pool and written back in input order; lines using
+# ans are still evaluated here, after the lines before them. Function definitions
+# are run by each worker, and here only once a line evaluated here might use them.
+# Returns (lines, errors, seconds).
+def batch(infile, outfile, workers=1):
+    round_thresh = ROUND_THRESH
+    commas = COMMAS
+    batch_ans = None
+    num_lines = 0
+    num_errors = 0
+    start = time.perf_counter()
+    skipped = [] # definitions evaluated by workers but not yet here
+
+    def write_chunk(lines, evaluated):
+        nonlocal batch_ans, num_lines, num_errors
+        results = []
+        for line, evaluation in zip(lines, evaluated):
+            if evaluation is None:
+                for definition in skipped:
+                    evaluate_line(definition, None, round_thresh, commas)
+                skipped.clear()
+                evaluation = evaluate_line(line, batch_ans, round_thresh, commas)
+            elif "=" in line:
+                skipped.append(line)
+            result, val = evaluation
+            if val is not None:
+                batch_ans = val
+            elif result:
+                num_errors += 1
+            results.append(result)
+        num_lines += len(lines)
+        outfile.write("\n".join(results) + "\n")
+
+    if workers <= 1:
+        for lines in read_chunks(infile, BATCH_CHUNK):
+            write_chunk(lines, [None] * len(lines))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers, initializer=allow_digits) as pool:
+            # Bounded number of chunks in flight so memory doesn't grow with the input
+            pending = deque()
+            definitions = [] # definition lines read so far
+            uses_ans = False
+            for lines in read_chunks(infile, BATCH_CHUNK):
+                # After a definition using ans the workers can't replay the definitions,
+                # so the remaining chunks are evaluated here
+                if uses_ans:
+                    future = None
+                else:
+                    future = pool.submit(evaluate_chunk, lines, round_thresh, commas, tuple(definitions))
+                    new = [line for line in lines if "=" in line]
+                    definitions.extend(new)
+                    uses_ans = any("ans" in line for line in new)
+                pending.append((lines, future))
+                if len(pending) >= 2 * workers:
+                    lines, future = pending.popleft()
+                    write_chunk(lines, future.result() if future is not None else [None] * len(lines))
+            while pending:
+                lines, future = pending.popleft()
+                write_chunk(lines, future.result() if future is not None else [None] * len(lines))
+    outfile.flush()
+    return num_lines, num_errors, time.perf_counter() - start
+
+# Writes the graph of each line of infile to directory/<line number>.<fmt> using
+# calc_export instead of plotly, and one output line per input line to outfile with
+# the file written or the error. svg files are downsampled to PLOT_POINTS; csv and
+# npy files hold every sample, written a chunk at a time without adaptive sampling so
+# that NUM_SAMPLES isn't limited by memory. Returns (lines, errors, seconds).
+def export(infile, outfile, directory, fmt):
+    import calc_export
+    import calc_sampling as cs
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    write = calc_export.writers[fmt]
+    num_lines = 0
+    num_errors = 0
+    start = time.perf_counter()
+    for lines in read_chunks(infile, BATCH_CHUNK):
+        results = []
+        for line in lines:
+            num_lines += 1
+            result = ""
+            try:
+                parsed = parse_cache.parse(line, None)
+                if parsed is not None:
+                    expr, graph_mode = parsed
+                    if not graph_mode:
+                        raise ValueError("Not a graph (no x in expression)")
+                    path = directory / f"{num_lines}.{fmt}"
+                    if fmt == "svg":
+                        write(path, *plot_graphs([expr])[0])
+                    elif ADAPTIVE:
+                        write(path, *sample_graph(expr))
+                    else:
+                        with calc_export.streams[fmt](path, NUM_SAMPLES) as consumer:
+                            cs.stream(expr, consumer, DOMAIN, NUM_SAMPLES)
+                    result = str(path)
+            except (ValueError, TypeError, cp.ParseError, OverflowError, ZeroDivisionError, RecursionError) as e:
+                num_errors += 1
+                result = "Error: " + error_message(e)
+            results.append(result)
+        outfile.write("\n".join(results) + "\n")
+    outfile.flush()
+    return num_lines, num_errors, time.perf_counter() - start
+
+def batch_main(in_path, out_path, workers=1, export_dir=None, fmt="svg"):
+    infile = sys.stdin if in_path == "-" else open(in_path)
+    outfile = sys.stdout if out_path is None else open(out_path, "w")
+    try:
+        if export_dir is None:
+            num_lines, num_errors, seconds = batch(infile, outfile, workers)
+        else:
+            num_lines, num_errors, seconds = export(infile, outfile, export_dir, fmt)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    rate = num_lines / seconds if seconds > 0 else float("inf")
+    print(f"{num_lines:,} lines ({num_errors:,} errors) in {seconds:.3f} s, "
+          f"{rate:,.0f} lines/s", file=sys.stderr)
+
 def main():
     try:
         print("calc> ", end="")
@@ -119,4 +462,20 @@ def main():
         return
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Command line calculator")
+    parser.add_argument("-b", "--batch", metavar="FILE", nargs="?", const="-",
+                        help="evaluate each line of FILE (or stdin) without prompting")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write batch results to FILE instead of stdout")
+    parser.add_argument("-j", "--jobs", metavar="N", type=int, default=1,
+                        help="number of worker processes for batch mode")
+    parser.add_argument("-e", "--export", metavar="DIR",
+                        help="in batch mode, save each line's graph to a file in DIR")
+    parser.add_argument("-f", "--format", choices=("svg", "csv", "npy"), default="svg",
+                        help="file format for --export")
+    args = parser.parse_args()
+    allow_digits()
+    if args.batch is not None:
+        batch_main(args.batch, args.output, args.jobs, args.export, args.format)
+    else:
+        main()
\ No newline at end of file
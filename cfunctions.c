@@ -1,16 +1,78 @@
+#include <float.h>
+#include <stddef.h>
 #include <stdint.h>
 
 /* Only valid input should be passed in. 
  * All the checking should be done in the Python file. */
 
+/* Numbers below SIEVE_LIMIT are looked up in a bitset of the odd numbers,
+ * built the first time one is tested. Above it Miller-Rabin is used. */
+#define SIEVE_LIMIT (1u << 20)
+static uint8_t composite[SIEVE_LIMIT / 16];
+static int sieve_built = 0;
+
+static void build_sieve(void) {
+    /* Bit i of composite stands for 2i + 1 */
+    composite[0] |= 1;
+    for (uint32_t p = 3; p * p < SIEVE_LIMIT; p += 2) {
+        if (composite[p / 16] >> (p / 2 % 8) & 1) continue;
+        for (uint32_t m = p * p; m < SIEVE_LIMIT; m += 2 * p) {
+            composite[m / 16] |= 1 << (m / 2 % 8);
+        }
+    }
+    sieve_built = 1;
+}
+
+static uint64_t mulmod(uint64_t a, uint64_t b, uint64_t n) {
+    return (unsigned __int128)a * b % n;
+}
+
+static uint64_t powmod(uint64_t a, uint64_t e, uint64_t n) {
+    uint64_t result = 1;
+    a %= n;
+    while (e) {
+        if (e & 1) result = mulmod(result, a, n);
+        a = mulmod(a, a, n);
+        e >>= 1;
+    }
+    return result;
+}
+
+/* Returns 1 if odd n passes the strong probable prime test to base a. */
+static int strong_probable_prime(uint64_t n, uint64_t a) {
+    uint64_t d = n - 1;
+    int s = 0;
+    while (d % 2 == 0) {
+        d /= 2;
+        s++;
+    }
+    a %= n;
+    if (a == 0) return 1;
+    uint64_t x = powmod(a, d, n);
+    if (x == 1 || x == n - 1) return 1;
+    for (int i = 1; i < s; i++) {
+        x = mulmod(x, x, n);
+        if (x == n - 1) return 1;
+    }
+    return 0;
+}
+
 /* Returns 1 if n is prime, 0 otherwise. */
 int prime(uint64_t n) {
-    if (n == 2 || n == 3) return 1;
-    if (n % 2 == 0 || n % 3 == 0) return 0;
-    for (uint64_t i = 5; i*i <= n; i+=6) {
-        if (n % i == 0 || n % (i + 2) == 0) {
-            return 0;
-        }
+    if (n < SIEVE_LIMIT) {
+        if (n < 2) return 0;
+        if (n % 2 == 0) return n == 2;
+        if (!sieve_built) build_sieve();
+        return !(composite[n / 16] >> (n / 2 % 8) & 1);
+    }
+    static const uint32_t small_primes[] = {2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37};
+    for (int i = 0; i < 12; i++) {
+        if (n % small_primes[i] == 0) return 0;
+    }
+    /* Jim Sinclair's bases, deterministic for every n < 2^64 */
+    static const uint64_t bases[] = {2, 325, 9375, 28178, 450775, 9780504, 1795265022};
+    for (int i = 0; i < 7; i++) {
+        if (!strong_probable_prime(n, bases[i])) return 0;
     }
     return 1;
 }
@@ -18,12 +80,65 @@ int prime(uint64_t n) {
 /* Returns the nth number in the Fibonocci sequence. */
 // fib(95) > UINT64_MAX
 uint64_t fib(int n) {
-    if (n == 1) return 0;
-    if (n == 2) return 1;
-    uint64_t prev = 0, curr = 1;
-    for (int i = 2; i < n; i++) {
-        curr += prev;
-        prev = curr - prev;
-    }
-    return curr;
-}
\ No newline at end of file
+    /* Fast doubling from the top bit of n - 1 down, keeping a = F(k), b = F(k + 1):
+     *   F(2k) = F(k) * (2F(k + 1) - F(k)),  F(2k + 1) = F(k)^2 + F(k + 1)^2
+     * b overflows on the last step for n = 94, but unsigned arithmetic wraps
+     * mod 2^64 so a is still exact. */
+    uint64_t k = n - 1, a = 0, b = 1;
+    for (int bit = 63; bit >= 0; bit--) {
+        uint64_t c = a * (2 * b - a);
+        uint64_t d = a * a + b * b;
+        if (k >> bit & 1) {
+            a = d;
+            b = c + d;
+        } else {
+            a = c;
+            b = d;
+        }
+    }
+    return a;
+}
+
+/* Array versions used by calc_integer, each handling a whole buffer of len
+ * elements per call. The results are doubles, which overflow to inf. */
+
+/* out[i] = prime(n[i]). Every n[i] must be at least 2. */
+void prime_array(const uint64_t *n, double *out, size_t len) {
+    for (size_t i = 0; i < len; i++) {
+        out[i] = prime(n[i]);
+    }
+}
+
+/* out[i] = C(n[i], m[i]), 0 if m[i] > n[i].
+ * Each factor (n - k + j) / j with k <= n / 2 is at least 2, so the loop ends
+ * by the time the result overflows. Multiplying before dividing keeps it exact
+ * while the products are below 2^53. */
+void comb_array(const uint64_t *n, const uint64_t *m, double *out, size_t len) {
+    for (size_t i = 0; i < len; i++) {
+        if (m[i] > n[i]) {
+            out[i] = 0;
+            continue;
+        }
+        uint64_t k = m[i] < n[i] - m[i] ? m[i] : n[i] - m[i];
+        double result = 1;
+        for (uint64_t j = 1; j <= k && result <= DBL_MAX; j++) {
+            result = result * (double)(n[i] - k + j) / j;
+        }
+        out[i] = result;
+    }
+}
+
+/* out[i] = P(n[i], m[i]), 0 if m[i] > n[i]. */
+void perm_array(const uint64_t *n, const uint64_t *m, double *out, size_t len) {
+    for (size_t i = 0; i < len; i++) {
+        if (m[i] > n[i]) {
+            out[i] = 0;
+            continue;
+        }
+        double result = 1;
+        for (uint64_t j = 0; j < m[i] && result <= DBL_MAX; j++) {
+            result *= n[i] - j;
+        }
+        out[i] = result;
+    }
+}
@@ -0,0 +1,194 @@
+import cmath
+import math
+import random
+import numpy as np
+import pytest
+import calc_lexer as cl
+import calc_parser as cp
+import calc_compiler as cc
+import calc_optimizer as co
+
+# calc_compiler.compile_expr must give the same results, and raise the same errors,
+# as the tree evaluator it replaces: for plain trees, graph-mode trees over x, DAGs
+# from calc_optimizer.share, and user-defined function bodies taking Params.
+
+ATOMS = ["1", "2", "3", "0", "2.5", "pi", "e", "-1", "ans"]
+FUNS = ["sqrt", "exp", "sin", "cos", "tan", "ln", "lg", "log", "floor", "ceil", "abs", "round",
+        "prime", "fib"]
+FUNS2 = ["gcf", "lcm", "C", "P"]
+OPS = ["+", "-", "*", "/", "^", "%", "mod"]
+ERRORS = (ValueError, TypeError, cp.ParseError, OverflowError, ZeroDivisionError)
+RANDOM_EXPRESSIONS = 3000
+RANDOM_USER_FUNCTIONS = 500
+
+EXPRESSIONS = [
+    "2+3", "-2^2", "-(2^2)", "2^-1", "5!", "-5!", "3 % 0", "1/0", "0^0", "sqrt(-1)", "ln(0)",
+    "C(10, 3) * P(5, 2) - gcf(84, 36)", "fib(90) + prime(97)", "2^1000", "10^400 / 3",
+    "-sin(-pi) - -cos(-pi)", "((1+2)*(3+4))^2 % 11", "lcm(4, 6) / -2", "ans^ans",
+]
+GRAPHS = [
+    "x", "-x", "sin(x)^2 + cos(x)^2", "1/x", "sqrt(x) - ln(x)", "x^x", "-x % 3", "prime(x) * fib(x)",
+    "sin(x)^2 + sin(x)*cos(x) + sin(x)", "x!", "floor(x) / ceil(x)",
+]
+
+# Random expressions of up to depth levels, from a fixed seed
+def random_expression(rng, depth, atoms, funs=FUNS):
+    r = rng.random()
+    if depth <= 0 or r < 0.3:
+        return rng.choice(atoms)
+    if r < 0.5:
+        return f"{rng.choice(funs)}({random_expression(rng, depth - 1, atoms, funs)})"
+    if r < 0.55:
+        return f"{rng.choice(FUNS2)}({random_expression(rng, depth - 1, atoms, funs)}, " \
+               f"{random_expression(rng, depth - 1, atoms, funs)})"
+    if r < 0.6:
+        return f"({random_expression(rng, depth - 1, atoms, funs)})!"
+    if r < 0.65:
+        return "-" + random_expression(rng, depth - 1, atoms, funs)
+    return random_expression(rng, depth - 1, atoms, funs) + rng.choice(OPS) + \
+        random_expression(rng, depth - 1, atoms, funs)
+
+def random_expressions(seed, atoms):
+    rng = random.Random(seed)
+    return [random_expression(rng, 4, atoms) for _ in range(RANDOM_EXPRESSIONS)]
+
+def parse(line):
+    try:
+        return cp.parse(cl.tokenize(line, 3))[0]
+    except ERRORS:
+        return None
+
+# ("ok", result) or ("error", type, message)
+def outcome(fun, *args):
+    try:
+        with np.errstate(all="ignore"):
+            return ("ok", fun(*args))
+    except ERRORS as e:
+        return ("error", type(e), str(e))
+
+def assert_same(expected, actual, line):
+    assert expected[0] == actual[0], (line, expected, actual)
+    if expected[0] == "error":
+        assert expected == actual, line
+        return
+    x, y = expected[1], actual[1]
+    if cp.isarray(x) or cp.isarray(y):
+        assert np.array_equal(x, y, equal_nan=True), line
+    elif isinstance(x, complex) and not cmath.isfinite(x):
+        # Multiplying by neg = 1 turns an infinite part into inf + nanj, which the
+        # compiled code (skipping that multiply) doesn't do
+        assert isinstance(y, complex), line
+    elif isinstance(x, float) and math.isnan(x):
+        assert isinstance(y, float) and math.isnan(y), line
+    else:
+        assert x == y and type(x) is type(y), line
+
+def check(expr, line):
+    assert_same(outcome(expr.evaluate), outcome(cc.compile_expr(expr)), line)
+
+@pytest.mark.parametrize("line", EXPRESSIONS + GRAPHS)
+def test_expressions(line):
+    expr = parse(line)
+    assert expr is not None
+    check(expr, line)
+
+def test_random_expressions():
+    for line in random_expressions(1, ATOMS):
+        expr = parse(line)
+        if expr is not None:
+            check(expr, line)
+
+def test_random_graphs():
+    for line in random_expressions(2, ATOMS + ["x"]):
+        expr = parse(line)
+        if expr is not None:
+            check(expr, line)
+
+# Shared nodes are computed once by the compiled code, but must give the same
+# results as the unshared tree
+@pytest.mark.parametrize("line", GRAPHS + EXPRESSIONS)
+def test_shared(line):
+    expr = parse(line)
+    assert_same(outcome(expr.evaluate), outcome(cc.compile_expr(co.share(co.optimize(expr)))), line)
+
+def test_shared_between_roots():
+    nodes = {}
+    lines = ["sin(x)^2", "sin(x)/x", "sin(x)"]
+    for line in lines:
+        expr = parse(line)
+        assert_same(outcome(expr.evaluate), outcome(cc.compile_expr(co.share(expr, nodes))), line)
+
+# The body of a user-defined function with its Params replaced by args, as a tree
+def bind(expr, params, args):
+    if isinstance(expr, cp.Value):
+        new = cp.Value(args[expr.val.index] if isinstance(expr.val, cp.Param) else expr.val)
+    elif isinstance(expr, cp.Function):
+        new = cp.Function(expr.fun, tuple(bind(child, params, args) for child in expr.exprs))
+    else:
+        new = cp.Binop(expr.op, bind(expr.expr1, params, args), bind(expr.expr2, params, args))
+    new.neg = expr.neg
+    return new
+
+@pytest.mark.parametrize("definition", [
+    "tf(a) = a^2 + 1",
+    "tg(a, b) = -a/b + b!",
+    "th(a, b, d) = sin(a)*a - sqrt(b)^d + a*a",
+    "tk(x) = -x + fib(x) % 7",
+])
+def test_user_functions(definition):
+    fun = cp.define(cl.tokenize(definition, None))
+    try:
+        for args in [(2, 3, 0.5), (0, 0, 0), (-1.5, 4, 2), (10, -2, 3)]:
+            args = args[:len(fun.params)]
+            expected = outcome(bind(fun.body, fun.params, args).evaluate)
+            assert_same(expected, outcome(fun.compiled, *args), (definition, args))
+            assert_same(expected, outcome(fun, *args), (definition, args))
+            call = f"{fun.name}({', '.join(map(str, args))})"
+            check(parse(call), call)
+    finally:
+        undefine(fun)
+
+def undefine(fun):
+    del cp.user_functions[fun.name], cp.Function.functions[fun.name], cp.Function.num_params[fun.name]
+
+# The body of a definition as parsed, before calc_optimizer simplifies it
+def unoptimized_body(definition, fun):
+    toks = cl.tokenize(definition, None)
+    params = {param.name: param for param in fun.params}
+    start = next(i for i, tok in enumerate(toks) if tok[0] == "EQUAL") + 1
+    return cp.parse_expression(cp.preprocess(toks[start:], params), params=params)[0]
+
+@pytest.mark.parametrize("definition, args", [
+    ("tq(a) = a/1", (3,)),
+    ("tq(a) = a/1", (10**400,)),
+    ("tq(a) = (a/1)!", (3,)),
+    ("tq(a) = a*1 + 0", (-0.0,)),
+    ("tq(a, b) = -a/-b", (7, 2)),
+])
+def test_user_function_identities(definition, args):
+    fun = cp.define(cl.tokenize(definition, None))
+    try:
+        expected = outcome(bind(unoptimized_body(definition, fun), fun.params, args).evaluate)
+        assert_same(expected, outcome(fun, *args), (definition, args))
+    finally:
+        undefine(fun)
+
+# Bodies are optimized when they're defined, which must not change their results or
+# errors: calls compare with evaluating the body as parsed, its Params bound to the args
+def test_random_user_functions():
+    rng = random.Random(3)
+    atoms = ["1", "0", "2", "2.5", "pi", "-1", "a", "b", "a", "b"]
+    funs = [fun for fun in FUNS if fun not in ("prime", "fib")] # slow for large arguments
+    for i in range(RANDOM_USER_FUNCTIONS):
+        definition = f"tr{i}(a, b) = {random_expression(rng, 3, atoms, funs)}"
+        try:
+            fun = cp.define(cl.tokenize(definition, None))
+        except ERRORS:
+            continue
+        try:
+            body = unoptimized_body(definition, fun)
+            for args in [(3, 1), (-0.0, 0), (2.5, -1), (7, 2)]:
+                expected = outcome(bind(body, fun.params, args).evaluate)
+                assert_same(expected, outcome(fun, *args), (definition, args))
+        finally:
+            undefine(fun)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import calculator as calc
+import calc_lexer as cl
+import calc_parser as cp
+
+# Every curve sampled for a graph has one y per x, including expressions whose value
+# doesn't depend on x (a constant among several graphs, or a user function ignoring
+# its parameter), which give flat lines with both uniform and adaptive sampling.
+
+@pytest.fixture(params=[False, True], ids=["uniform", "adaptive"])
+def adaptive(request, monkeypatch):
+    monkeypatch.setattr(calc, "ADAPTIVE", request.param)
+    return request.param
+
+@pytest.fixture
+def flat_function():
+    cp.define(cl.tokenize("tflat(a) = 1", None))
+    calc.parse_cache.clear()
+    yield "tflat"
+    del cp.user_functions["tflat"], cp.Function.functions["tflat"], cp.Function.num_params["tflat"]
+    calc.parse_cache.clear()
+
+def check_curve(x, y, flat=None):
+    assert x.shape == y.shape
+    assert np.all(np.diff(x) > 0)
+    if flat is not None:
+        assert np.all(y == flat)
+    # Plotting downsamples the curve, which needs arrays
+    calc.figure([(None, x, y)])
+
+@pytest.mark.parametrize("samples", [1000, 10_000])
+def test_flat_user_function(adaptive, flat_function, samples, monkeypatch):
+    monkeypatch.setattr(calc, "NUM_SAMPLES", samples)
+    expr, graph_mode = calc.parse_cache.parse(f"{flat_function}(x)", None)
+    assert graph_mode
+    check_curve(*calc.sample_graph(expr), flat=1)
+
+def test_several_graphs(adaptive, flat_function):
+    lines = ["sin(x)", "2", f"{flat_function}(x)", "-3.5"]
+    curves = calc.sample_graphs(lines)
+    assert len(curves) == len(lines)
+    check_curve(*curves[0])
+    for (x, y), flat in zip(curves[1:], [2, 1, -3.5]):
+        check_curve(x, y, flat)
+
+def test_shared_subexpressions_match():
+    lines = ["sin(x)^2", "sin(x)*cos(x)", "sin(x)"]
+    curves = calc.sample_graphs(lines)
+    for line, (x, y) in zip(lines, curves):
+        expected = cp.parse(cl.tokenize(line, None))[0].evaluate()
+        assert np.allclose(y, expected, equal_nan=True)
@@ -0,0 +1,65 @@
+import math
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pytest
+
+# Guards the lazy imports that keep one-shot calculations fast to start: numpy,
+# plotly and the cfunctions library (through ctypes) are only loaded by lines that
+# need them. benchmarks/bench_startup.py reports the timings in more detail.
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ["numpy", "plotly", "ctypes"]
+RUNS = 5
+# Most a one-shot calculation may take over bare interpreter startup. Well above
+# what it takes now (about 30 ms) so that slow machines pass, but below what
+# importing numpy and plotly up front cost.
+COLD_START_BUDGET_MS = 150
+
+def run(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                          capture_output=True, text=True).stdout
+
+# Modules from HEAVY_MODULES imported by evaluating line one-shot
+def heavy_imports(line):
+    return run("import sys, io, calculator as calc\n"
+               f"calc.batch(io.StringIO({line!r}), io.StringIO())\n"
+               f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))").split()
+
+def cold_start(code):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run(code)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+@pytest.mark.parametrize("line, modules", [
+    ("1+2", []),
+    ("f(a) = a^2 + 1", []),
+    ("3*sin(2)^2 + 5! - C(10, 3)", []),
+    ("prime(97) + fib(100)", ["ctypes"]),
+    ("sin(x)", ["numpy", "ctypes"]),
+])
+def test_heavy_imports(line, modules):
+    assert heavy_imports(line) == modules
+
+def test_cold_start():
+    interpreter = cold_start("pass")
+    one_shot = cold_start("import io, calculator as calc\n"
+                          "calc.batch(io.StringIO('1+2'), io.StringIO())")
+    assert (one_shot - interpreter) * 1e3 < COLD_START_BUDGET_MS
+
+# The int digit limit is interpreter-wide, so importing the calculator leaves it alone;
+# the program raises it for itself and its batch workers
+def test_digit_limit():
+    assert run("import sys, calculator, calc_vector\n"
+               "print(sys.get_int_max_str_digits())").strip() == str(sys.get_int_max_str_digits())
+    # fib(n) is the int nearest phi^n / sqrt(5)
+    digits = math.floor(100_000 * math.log10((1 + math.sqrt(5)) / 2) - math.log10(5) / 2) + 1
+    for jobs in ["1", "2"]:
+        output = subprocess.run([sys.executable, "calculator.py", "-b", "-j", jobs], cwd=ROOT, check=True,
+                                input="fib(100000)\n", capture_output=True, text=True).stdout
+        assert len(output.strip().replace(",", "")) == digits
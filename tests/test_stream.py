@@ -0,0 +1,74 @@
+import io
+import numpy as np
+import pytest
+import calculator as calc
+import calc_export
+import calc_parser as cp
+import calc_sampling as cs
+
+# Graphs evaluated a chunk of samples at a time (calc_sampling.stream) must give the
+# same plotted points and exported files as evaluating every sample at once.
+
+LINES = ["sin(x)", "tan(x)", "ln(x)", "1/x", "2", "sqrt(x) + floor(x)", "x^2 - 3x"]
+SAMPLES = 10_000
+CHUNK_SIZE = 999 # not a divisor of SAMPLES, so the last chunk is shorter
+
+@pytest.fixture(autouse=True)
+def samples(monkeypatch):
+    monkeypatch.setattr(calc, "NUM_SAMPLES", SAMPLES)
+    monkeypatch.setattr(calc, "ADAPTIVE", False)
+
+def parse(line):
+    expr, graph_mode = calc.parse_cache.parse(line, None)
+    return expr
+
+def assert_equal(expected, actual):
+    for a, b in zip(expected, actual):
+        assert a.shape == b.shape
+        assert np.array_equal(a, b, equal_nan=True)
+
+def test_cache_leaves_x_unbound():
+    cp.grid = None
+    calc.parse_cache.clear()
+    expr = parse("sin(x)^2")
+    assert cp.grid is None
+    assert cs.samples_of(expr) is cp.unbound_samples()
+
+@pytest.mark.parametrize("line", LINES)
+@pytest.mark.parametrize("target", [100, 4000, SAMPLES])
+def test_downsampler(line, target):
+    expr = parse(line)
+    with np.errstate(all="ignore"):
+        x, y = calc.sample_graph(expr)
+        downsampler = cs.Downsampler(calc.DOMAIN, SAMPLES, target)
+        cs.stream(expr, downsampler, calc.DOMAIN, SAMPLES, CHUNK_SIZE)
+    assert_equal(cs.downsample(x, y, target), downsampler.result())
+
+def test_plot_graphs():
+    exprs = [parse(line) for line in LINES]
+    with np.errstate(all="ignore"):
+        expected = [cs.downsample(x, y, calc.PLOT_POINTS) for x, y in calc.sample_graphs(LINES)]
+        for curve, points in zip(expected, calc.plot_graphs(exprs)):
+            assert_equal(curve, points)
+
+@pytest.mark.parametrize("fmt", ["csv", "npy"])
+@pytest.mark.parametrize("line", LINES)
+def test_export_streams(fmt, line, tmp_path):
+    expr = parse(line)
+    with np.errstate(all="ignore"):
+        calc_export.writers[fmt](tmp_path / f"whole.{fmt}", *calc.sample_graph(expr))
+        with calc_export.streams[fmt](tmp_path / f"streamed.{fmt}", SAMPLES) as consumer:
+            cs.stream(expr, consumer, calc.DOMAIN, SAMPLES, CHUNK_SIZE)
+    assert (tmp_path / f"whole.{fmt}").read_bytes() == (tmp_path / f"streamed.{fmt}").read_bytes()
+
+# More samples than one of calc_sampling's chunks
+def test_export(tmp_path, monkeypatch):
+    monkeypatch.setattr(calc, "NUM_SAMPLES", 2 * cs.CHUNK_SIZE + 1)
+    lines = [line for line in LINES if "x" in line]
+    out = io.StringIO()
+    with np.errstate(all="ignore"):
+        calc.export(io.StringIO("\n".join(lines)), out, tmp_path, "npy")
+        for i, line in enumerate(lines, 1):
+            assert out.getvalue().splitlines()[i - 1] == str(tmp_path / f"{i}.npy")
+            x, y = calc.sample_graph(parse(line))
+            assert np.array_equal(np.load(tmp_path / f"{i}.npy"), np.vstack((x, y)), equal_nan=True)